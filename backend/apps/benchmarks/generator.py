@@ -0,0 +1,115 @@
+"""
+Генератор синтетических данных для бенчмарков.
+
+Строит заданное число ролей, бизнес-элементов, правил доступа, пользователей
+и записей контента. Случайность задается seed, поэтому два запуска с одинаковыми
+параметрами дают одинаковый набор данных и сравнимые результаты.
+"""
+import random
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.content.models import Project, Task, Report
+from apps.custom_auth.models import AccessRule, BusinessElement, CustomUser, Role
+from apps.custom_auth.permissions import PERMISSION_FLAGS
+
+# Бизнес-элементы, к которым обращаются эндпоинты API
+API_ELEMENTS = ('projects', 'tasks', 'reports', 'roles', 'access_rules', 'business_elements')
+
+BENCHMARK_PASSWORD = 'benchmark123'
+FULL_ACCESS_ROLE = 'bench-admin'
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    users: int = 200
+    roles: int = 10
+    elements: int = 10
+    rows: int = 5000
+    roles_per_user: int = 2
+    seed: int = 42
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def _random_flags(rng):
+    return {flag: rng.random() < 0.5 for flag in PERMISSION_FLAGS}
+
+
+@transaction.atomic
+def generate_dataset(spec):
+    """
+    Заполняет базу по спецификации и возвращает число созданных объектов.
+
+    Первая роль дает полный доступ ко всем элементам и назначается первому
+    пользователю; остальные роли получают случайные наборы флагов.
+    rows - число записей каждого типа контента, владельцы выбираются случайно.
+    """
+    rng = random.Random(spec.seed)
+    batch_size = settings.BULK_BATCH_SIZE
+
+    element_names = list(API_ELEMENTS[:spec.elements])
+    element_names += [f'bench-element-{index}' for index in range(spec.elements - len(element_names))]
+    elements = BusinessElement.objects.bulk_create(
+        [BusinessElement(name=name) for name in element_names], batch_size=batch_size
+    )
+
+    role_names = [FULL_ACCESS_ROLE] + [f'bench-role-{index}' for index in range(1, spec.roles)]
+    roles = Role.objects.bulk_create([Role(name=name) for name in role_names], batch_size=batch_size)
+
+    rules = []
+    for index, role in enumerate(roles):
+        for element in elements:
+            flags = dict.fromkeys(PERMISSION_FLAGS, True) if index == 0 else _random_flags(rng)
+            rules.append(AccessRule(role=role, element=element, **flags))
+    AccessRule.objects.bulk_create(rules, batch_size=batch_size)
+
+    # bcrypt намеренно медленный - один хеш на всех пользователей
+    password_hash = CustomUser.hash_password(BENCHMARK_PASSWORD)
+    users = CustomUser.objects.bulk_create(
+        [
+            CustomUser(email=f'bench{index}@test.com', first_name=f'Bench {index}', password_hash=password_hash)
+            for index in range(spec.users)
+        ],
+        batch_size=batch_size,
+    )
+
+    through = CustomUser.roles.through
+    memberships = [through(customuser_id=users[0].pk, role_id=roles[0].pk)] if users else []
+    regular_roles = roles[1:] or roles
+    for user in users[1:]:
+        for role in rng.sample(regular_roles, min(spec.roles_per_user, len(regular_roles))):
+            memberships.append(through(customuser_id=user.pk, role_id=role.pk))
+    through.objects.bulk_create(memberships, batch_size=batch_size)
+
+    if users:
+        Project.objects.bulk_create(
+            [
+                Project(title=f'Project {index}', description='Benchmark', owner=rng.choice(users))
+                for index in range(spec.rows)
+            ],
+            batch_size=batch_size,
+        )
+        Task.objects.bulk_create(
+            [Task(title=f'Task {index}', assignee=rng.choice(users)) for index in range(spec.rows)],
+            batch_size=batch_size,
+        )
+        Report.objects.bulk_create(
+            [
+                Report(title=f'Report {index}', content='Benchmark', author=rng.choice(users))
+                for index in range(spec.rows)
+            ],
+            batch_size=batch_size,
+        )
+
+    return {
+        'users': len(users),
+        'roles': len(roles),
+        'elements': len(elements),
+        'access_rules': len(rules),
+        'user_roles': len(memberships),
+        'rows_per_model': spec.rows if users else 0,
+    }
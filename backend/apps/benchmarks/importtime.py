@@ -0,0 +1,61 @@
+"""
+Время загрузки воркера: импорт Django, приложений и URLconf в отдельном процессе
+под `python -X importtime`, с документацией API и без нее.
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# То, что воркер gunicorn импортирует до первого ответа
+BOOT_CODE = 'import django; django.setup(); import config.urls'
+
+
+def parse_importtime(output):
+    """Строки `import time: self [us] | cumulative | module` -> [(модуль, self_us, cumulative_us)]"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        modules.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return modules
+
+
+def summarize_importtime(modules, top=10):
+    """Общее время импорта и самые дорогие пакеты верхнего уровня (по собственному времени модулей)"""
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split('.')[0]] += self_us
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'total_ms': round(sum(self_us for _, self_us, _ in modules) / 1000, 1),
+        'modules': len(modules),
+        'drf_yasg_imported': 'drf_yasg' in packages,
+        'top_packages_ms': {package: round(self_us / 1000, 1) for package, self_us in heaviest},
+    }
+
+
+def measure_import_time(docs_enabled, repeat=3):
+    """Лучший из repeat запусков: холодный процесс, импорт по BOOT_CODE"""
+    env = dict(os.environ, API_DOCS_ENABLED='true' if docs_enabled else 'false')
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_CODE],
+            cwd=settings.BASE_DIR.parent, env=env, capture_output=True, text=True, check=True,
+        )
+        runs.append(summarize_importtime(parse_importtime(result.stderr)))
+    return min(runs, key=lambda run: run['total_ms'])
+
+
+def run_import_time_report(repeat=3):
+    return {
+        'docs_enabled': measure_import_time(True, repeat),
+        'docs_disabled': measure_import_time(False, repeat),
+    }
@@ -0,0 +1,108 @@
+"""
+Сквозной нагрузочный драйвер: запросы идут через весь стек Django
+(middleware, декораторы, вьюсеты, сериализаторы) в том же процессе,
+без сети, поэтому замеры показывают стоимость самого приложения.
+"""
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.content.models import Project
+from apps.custom_auth.models import CustomUser
+
+from .generator import FULL_ACCESS_ROLE
+from .stats import summarize_latencies
+
+LIST_ENDPOINTS = (
+    '/api/v1/projects/',
+    '/api/v1/tasks/',
+    '/api/v1/reports/',
+    '/api/auth/roles/',
+)
+
+
+def benchmark_users(seed):
+    """Пользователь с полным доступом и случайный обычный пользователь"""
+    admin = CustomUser.objects.filter(roles__name=FULL_ACCESS_ROLE).order_by('pk').first()
+    others = list(CustomUser.objects.exclude(roles__name=FULL_ACCESS_ROLE).values_list('pk', flat=True))
+    users = {'full_access': admin}
+    if others:
+        users['regular'] = CustomUser.objects.get(pk=random.Random(seed).choice(others))
+    return {name: user for name, user in users.items() if user is not None}
+
+
+@contextmanager
+def capture_queries():
+    """
+    Запросы ко всем базам, куда роутер может отправить чтение (основная и реплики):
+    списки читаются с реплики, и подсчет только по default показал бы ноль
+    """
+    with ExitStack() as stack:
+        yield [
+            stack.enter_context(CaptureQueriesContext(connections[alias]))
+            for alias in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS)
+        ]
+
+
+@contextmanager
+def quiet_instrumentation_log():
+    """JSON-строки QueryInstrumentationMiddleware не смешиваются с выводом бенчмарка"""
+    logger = logging.getLogger('apps.monitoring')
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+def run_scenario(client, path, token, requests):
+    latencies, queries, statuses = [], [], Counter()
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get(path, headers=headers)  # прогрев: матрица прав, кеш токена, план загрузки
+    for _ in range(requests):
+        with capture_queries() as captured:
+            started = time.perf_counter_ns()
+            response = client.get(path, headers=headers)
+            latencies.append(time.perf_counter_ns() - started)
+        queries.append(sum(len(context.captured_queries) for context in captured))
+        statuses[response.status_code] += 1
+    return {
+        **summarize_latencies(latencies),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries, default=None),
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def run_load(requests=200, seed=42):
+    """
+    Прогоняет по requests запросов на каждый эндпоинт от имени каждого пользователя.
+    Замер задержки включает подсчет запросов к БД, который сам по себе добавляет
+    небольшие накладные расходы - одинаковые для всех сравниваемых коммитов.
+    Кеш списков выключен: повторные запросы иначе измеряли бы только попадания в кеш
+    """
+    with override_settings(CONTENT_LIST_CACHE_ENABLED=False), quiet_instrumentation_log():
+        return _run_load(requests, seed)
+
+
+def _run_load(requests, seed):
+    client = Client()
+    results = {}
+    for user_name, user in benchmark_users(seed).items():
+        token = user.generate_jwt_token()
+        # Ключ сценария не зависит от id объектов, чтобы отчеты разных запусков совпадали по ключам
+        paths = [(path, path) for path in LIST_ENDPOINTS]
+        detail_id = Project.objects.filter(owner=user).order_by('pk').values_list('pk', flat=True).first()
+        if detail_id is not None:
+            paths.append(('/api/v1/projects/<id>/', f'/api/v1/projects/{detail_id}/'))
+        for label, path in paths:
+            results[f'{user_name} GET {label}'] = run_scenario(client, path, token, requests)
+    return results
@@ -0,0 +1,92 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.benchmarks.bulk_data import (
+    CONTENT_MODELS,
+    BulkDataSpec,
+    chunk_ranges,
+    create_roles,
+    generated_user_ids,
+    run_chunks,
+)
+from apps.content.cache import bump_data_version
+from apps.custom_auth.models import CustomUser
+from apps.custom_auth.permissions import bump_rbac_generation, invalidate_permission_matrix
+
+
+class Command(BaseCommand):
+    help = 'Генерация больших объемов синтетических данных (пользователи, роли, контент) пачками bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--roles', type=int, default=BulkDataSpec.roles)
+        parser.add_argument('--roles-per-user', type=int, default=BulkDataSpec.roles_per_user)
+        parser.add_argument('--rows', type=int, default=1000000, help='Записей каждого типа контента')
+        parser.add_argument('--seed', type=int, default=BulkDataSpec.seed)
+        parser.add_argument('--skew', type=float, default=BulkDataSpec.skew,
+                            help='Перекос владения: 1 - равномерно, больше - строки сосредоточены у части пользователей')
+        parser.add_argument('--prefix', default=BulkDataSpec.prefix, help='Префикс email и имен ролей')
+        parser.add_argument('--password', default='password123', help='Пароль всех пользователей (хешируется один раз)')
+        parser.add_argument('--batch-size', type=int, default=BulkDataSpec.batch_size)
+        parser.add_argument('--chunk-size', type=int, default=BulkDataSpec.chunk_size,
+                            help='Строк в одной транзакции; вместе с seed определяет итоговые данные')
+        parser.add_argument('--workers', type=int, default=1, help='Число параллельных процессов')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        if options['skew'] < 1:
+            raise CommandError('--skew не может быть меньше 1')
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite блокирует базу на запись целиком - параллельная вставка только помешает
+            self.stdout.write(self.style.WARNING('SQLite не поддерживает параллельную запись, используется один процесс'))
+            workers = 1
+
+        spec = BulkDataSpec(
+            users=options['users'],
+            roles=options['roles'],
+            roles_per_user=options['roles_per_user'],
+            rows=options['rows'],
+            seed=options['seed'],
+            skew=options['skew'],
+            prefix=options['prefix'],
+            # bcrypt намеренно медленный: один хеш на всех пользователей
+            password_hash=CustomUser.hash_password(options['password']),
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+        )
+        started = time.monotonic()
+
+        role_ids = create_roles(spec)
+        self.stdout.write(f'Роли: {len(role_ids)}')
+
+        self.run_stage(spec, [('users', *chunk) for chunk in chunk_ranges(spec.users, spec.chunk_size)], workers)
+        user_ids = generated_user_ids(spec)
+
+        self.run_stage(
+            spec, [('user_roles', *chunk) for chunk in chunk_ranges(spec.users, spec.chunk_size)], workers,
+            user_ids, role_ids,
+        )
+        content_tasks = [
+            (kind, *chunk) for kind in CONTENT_MODELS for chunk in chunk_ranges(spec.rows, spec.chunk_size)
+        ]
+        self.run_stage(spec, content_tasks, workers, user_ids)
+        # bulk_create не отправляет сигналы: без явной смены версий воркеры продолжили бы
+        # отдавать закешированные списки и доверять claims и матрице прав старого поколения RBAC
+        bump_data_version(CustomUser, *(model for model, _ in CONTENT_MODELS.values()))
+        invalidate_permission_matrix()
+        bump_rbac_generation()
+
+        self.stdout.write(self.style.SUCCESS(f'Данные созданы за {time.monotonic() - started:.1f} с'))
+
+    def run_stage(self, spec, tasks, workers, user_ids=(), role_ids=()):
+        totals = Counter()
+        for kind, count in run_chunks(spec, tasks, workers, user_ids, role_ids):
+            totals[kind] += count
+            self.stdout.write(f'{kind}: {totals[kind]}')
+        return totals
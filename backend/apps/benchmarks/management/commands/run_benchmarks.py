@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.benchmarks.generator import DatasetSpec, generate_dataset
+from apps.benchmarks.importtime import run_import_time_report
+from apps.benchmarks.load import run_load
+from apps.benchmarks.micro import run_micro_benchmarks
+from apps.benchmarks.report import build_report, compare_reports, read_report, write_report
+from apps.custom_auth.permissions import invalidate_permission_matrix
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарки RBAC API на синтетических данных во временной тестовой базе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=DatasetSpec.users)
+        parser.add_argument('--roles', type=int, default=DatasetSpec.roles)
+        parser.add_argument('--elements', type=int, default=DatasetSpec.elements)
+        parser.add_argument('--rows', type=int, default=DatasetSpec.rows, help='Записей каждого типа контента')
+        parser.add_argument('--roles-per-user', type=int, default=DatasetSpec.roles_per_user)
+        parser.add_argument('--seed', type=int, default=DatasetSpec.seed)
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на каждый сценарий нагрузки')
+        parser.add_argument('--number', type=int, default=10000, help='Повторов в микробенчмарках')
+        parser.add_argument('--import-repeat', type=int, default=3,
+                            help='Запусков python -X importtime на вариант (0 - не измерять)')
+        parser.add_argument('--output', default='benchmark-report.json', help='Файл JSON-отчета')
+        parser.add_argument('--compare', help='Отчет предыдущего запуска для сравнения')
+
+    def handle(self, *args, **options):
+        spec = DatasetSpec(
+            users=options['users'],
+            roles=options['roles'],
+            elements=options['elements'],
+            rows=options['rows'],
+            roles_per_user=options['roles_per_user'],
+            seed=options['seed'],
+        )
+
+        # Рабочая база не затрагивается: данные создаются во временной тестовой базе
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        invalidate_permission_matrix()
+        try:
+            self.stdout.write('Генерация данных...')
+            dataset = generate_dataset(spec)
+            self.stdout.write('Микробенчмарки...')
+            micro = run_micro_benchmarks(number=options['number'])
+            self.stdout.write('Нагрузка...')
+            load = run_load(requests=options['requests'], seed=spec.seed)
+            import_time = None
+            if options['import_repeat']:
+                self.stdout.write('Время импорта при загрузке воркера...')
+                import_time = run_import_time_report(repeat=options['import_repeat'])
+            report = build_report(spec, dataset, micro, load, import_time)
+        finally:
+            invalidate_permission_matrix()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        write_report(report, options['output'])
+        for scenario, metrics in sorted(load.items()):
+            self.stdout.write(
+                f"{scenario}: p50={metrics['p50_ms']}ms p95={metrics['p95_ms']}ms "
+                f"p99={metrics['p99_ms']}ms queries={metrics['queries_per_request']}"
+            )
+        for variant, summary in sorted((import_time or {}).items()):
+            self.stdout.write(f"import {variant}: {summary['total_ms']}ms, модулей {summary['modules']}")
+
+        if options['compare']:
+            for scenario, metric, before, after, change in compare_reports(read_report(options['compare']), report):
+                style = self.style.ERROR if change and change > 0 else self.style.SUCCESS
+                self.stdout.write(style(f'{scenario} {metric}: {before} -> {after} ({change:+}%)'
+                                        if change is not None else f'{scenario} {metric}: {before} -> {after}'))
+
+        self.stdout.write(self.style.SUCCESS(f"Отчет сохранен в {options['output']}"))
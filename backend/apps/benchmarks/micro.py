@@ -0,0 +1,98 @@
+"""
+Микробенчмарки горячих путей авторизации и сериализации:
+проверка прав по матрице, декодирование JWT и пропускная способность сериализаторов.
+"""
+import jwt
+from django.conf import settings
+from django.db import connection
+
+from apps.content.models import Project, Task, Report
+from apps.content.serializers import ProjectSerializer, TaskSerializer, ReportSerializer
+from apps.custom_auth.mixins import related_loading_plan
+from apps.custom_auth.models import CustomUser
+from apps.custom_auth.permissions import PermissionMatrix, get_permission_matrix, get_role_ids, has_permission
+from apps.custom_auth.token_cache import decode_token, get_token_cache
+
+from .stats import measure
+
+SERIALIZERS = (
+    ('projects', Project, ProjectSerializer),
+    ('tasks', Task, TaskSerializer),
+    ('reports', Report, ReportSerializer),
+)
+
+
+def bench_permissions(number):
+    """Компиляция матрицы и проверка права для пользователя с несколькими ролями"""
+    user = CustomUser.objects.order_by('pk').last()
+    role_ids = get_role_ids(user) if user is not None else []
+    get_permission_matrix()
+    return {
+        'matrix_compile': measure(PermissionMatrix.compile, number=1, repeat=3),
+        'matrix_size': len(get_permission_matrix()),
+        'has_permission': measure(lambda: has_permission(role_ids, 'projects', 'read_all_permission'), number),
+    }
+
+
+def bench_jwt(number):
+    """Полная проверка подписи против попадания в кеш декодированных токенов"""
+    user = CustomUser.objects.order_by('pk').first()
+    if user is None:
+        return {}
+    token = user.generate_jwt_token()
+    get_token_cache().clear()
+    decode_token(token)
+    return {
+        'jwt_decode': measure(lambda: jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256']), number),
+        'decode_token_cached': measure(lambda: decode_token(token), number),
+    }
+
+
+def bench_serializers(page_size, repeat=5):
+    """Сериализация страницы объектов, загруженных так же, как в вьюсетах"""
+    results = {}
+    for name, model, serializer_class in SERIALIZERS:
+        select_related, _, only = related_loading_plan(serializer_class)
+        page = list(model.objects.select_related(*select_related).only(*only)[:page_size])
+        if not page:
+            continue
+        timing = measure(lambda: serializer_class(page, many=True).data, number=1, repeat=repeat)
+        results[name] = {
+            'objects': len(page),
+            'ms_per_page': round(timing['ns_per_op'] * 1e-6, 3),
+            'objects_per_sec': round(len(page) * 1e9 / timing['ns_per_op'], 1),
+        }
+    return results
+
+
+def bench_connections(number=20):
+    """
+    Получение соединения с БД (новое подключение или выдача из пула) против запроса
+    по уже открытому соединению - сколько стоит отказ от постоянных соединений
+    """
+    def ping():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def reconnect():
+        connection.close()
+        ping()
+
+    results = {
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'pooled': bool(connection.settings_dict['OPTIONS'].get('pool')),
+        'query_on_open_connection': measure(ping, number * 10),
+    }
+    # Внутри транзакции (например, в тестах) соединение нельзя закрыть
+    if not connection.in_atomic_block:
+        results['connect_and_query'] = measure(reconnect, number)
+    return results
+
+
+def run_micro_benchmarks(number=10000, page_size=500):
+    return {
+        'permissions': bench_permissions(number),
+        'jwt': bench_jwt(number),
+        'serializers': bench_serializers(page_size),
+        'connections': bench_connections(),
+    }
@@ -0,0 +1,78 @@
+"""JSON-отчет бенчмарков и сравнение двух отчетов (например, до и после коммита)"""
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.db import connection
+
+# Метрики сквозной нагрузки, по которым сравниваются отчеты
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(spec, dataset, micro, load, import_time=None):
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'bcrypt_rounds': settings.BCRYPT_ROUNDS,
+        },
+        'spec': spec.as_dict(),
+        'dataset': dataset,
+        'micro': micro,
+        'load': load,
+        'import_time': import_time,
+    }
+
+
+def write_report(report, path):
+    # Стабильный порядок ключей - отчеты разных коммитов удобно сравнивать diff'ом
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, sort_keys=True, ensure_ascii=False)
+        file.write('\n')
+
+
+def read_report(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def compare_reports(baseline, current):
+    """
+    Изменение метрик нагрузки по сценариям и времени импорта при загрузке воркера:
+    (сценарий, метрика, было, стало, изменение в %)
+    """
+    rows = []
+    for section, metric_names in (('load', COMPARED_METRICS), ('import_time', ('total_ms',))):
+        rows.extend(_compare_section(baseline.get(section) or {}, current.get(section) or {}, metric_names))
+    return rows
+
+
+def _compare_section(baseline, current, metric_names):
+    rows = []
+    for scenario, metrics in sorted(current.items()):
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        for metric in metric_names:
+            before, after = previous.get(metric), metrics.get(metric)
+            if before is None or after is None:
+                continue
+            change = round((after - before) / before * 100, 1) if before else None
+            rows.append((scenario, metric, before, after, change))
+    return rows
@@ -0,0 +1,48 @@
+"""Статистика по замерам: перцентили и сводка для JSON-отчета"""
+import math
+import time
+
+
+def percentile(samples, fraction):
+    """Перцентиль по методу ближайшего ранга; samples должны быть отсортированы"""
+    if not samples:
+        return None
+    rank = max(math.ceil(fraction * len(samples)), 1)
+    return samples[rank - 1]
+
+
+def summarize_latencies(latencies_ns):
+    """Сводка задержек в миллисекундах"""
+    samples = sorted(latencies_ns)
+    if not samples:
+        return {'count': 0}
+    to_ms = 1e-6
+    return {
+        'count': len(samples),
+        'mean_ms': round(sum(samples) / len(samples) * to_ms, 3),
+        'p50_ms': round(percentile(samples, 0.50) * to_ms, 3),
+        'p95_ms': round(percentile(samples, 0.95) * to_ms, 3),
+        'p99_ms': round(percentile(samples, 0.99) * to_ms, 3),
+        'max_ms': round(samples[-1] * to_ms, 3),
+    }
+
+
+def measure(func, number, repeat=5):
+    """
+    Вызывает func number раз в каждом из repeat повторов и берет лучший повтор -
+    как timeit, он меньше всего искажен фоновыми процессами.
+    Возвращает время одной операции в наносекундах и число операций в секунду.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter_ns() - started
+        best = elapsed if best is None else min(best, elapsed)
+    per_op = best / number
+    return {
+        'number': number,
+        'ns_per_op': round(per_op, 1),
+        'ops_per_sec': round(1e9 / per_op, 1) if per_op else None,
+    }
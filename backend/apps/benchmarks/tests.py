@@ -0,0 +1,158 @@
+import io
+import random
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.benchmarks.bulk_data import BulkDataSpec, generated_user_ids, skewed_index
+from apps.benchmarks.generator import DatasetSpec, generate_dataset
+from apps.benchmarks.importtime import measure_import_time, parse_importtime, summarize_importtime
+from apps.benchmarks.load import run_load
+from apps.benchmarks.micro import run_micro_benchmarks
+from apps.benchmarks.report import compare_reports
+from apps.benchmarks.stats import percentile, summarize_latencies
+from apps.content.models import Project, Task, Report
+from apps.custom_auth.models import AccessRule, BusinessElement, CustomUser, Role
+from apps.custom_auth.permissions import get_permission_matrix, get_rbac_generation
+
+
+class StatsTestCase(TestCase):
+    def test_percentile_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0.50), 50)
+        self.assertEqual(percentile(samples, 0.95), 95)
+        self.assertEqual(percentile(samples, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_summarize_latencies_in_milliseconds(self):
+        summary = summarize_latencies([3_000_000, 1_000_000, 2_000_000])
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['p50_ms'], 2.0)
+        self.assertEqual(summary['max_ms'], 3.0)
+
+    def test_compare_reports(self):
+        baseline = {'load': {'GET /a/': {'p95_ms': 10.0, 'queries_per_request': 2}}}
+        current = {'load': {'GET /a/': {'p95_ms': 5.0, 'queries_per_request': 1}, 'GET /b/': {'p95_ms': 1.0}}}
+        self.assertEqual(compare_reports(baseline, current), [
+            ('GET /a/', 'p95_ms', 10.0, 5.0, -50.0),
+            ('GET /a/', 'queries_per_request', 2, 1, -50.0),
+        ])
+
+
+class ImportTimeTestCase(TestCase):
+    def test_parse_and_summarize(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       500 |        500 |   drf_yasg.openapi\n'
+            'import time:      1500 |       2000 | drf_yasg\n'
+            'import time:      1000 |       1000 | json\n'
+            'Traceback-free noise\n'
+        )
+        modules = parse_importtime(output)
+        self.assertEqual(modules[0], ('drf_yasg.openapi', 500, 500))
+        summary = summarize_importtime(modules)
+        self.assertEqual(summary['total_ms'], 3.0)
+        self.assertEqual(summary['modules'], 3)
+        self.assertTrue(summary['drf_yasg_imported'])
+        self.assertEqual(list(summary['top_packages_ms'].items()), [('drf_yasg', 2.0), ('json', 1.0)])
+
+    def test_docs_disabled_worker_does_not_import_drf_yasg(self):
+        disabled = measure_import_time(docs_enabled=False, repeat=1)
+        enabled = measure_import_time(docs_enabled=True, repeat=1)
+        self.assertFalse(disabled['drf_yasg_imported'])
+        self.assertTrue(enabled['drf_yasg_imported'])
+        self.assertGreater(disabled['modules'], 0)
+
+
+class BenchmarkSuiteTestCase(TestCase):
+    spec = DatasetSpec(users=5, roles=3, elements=8, rows=20, seed=1)
+
+    def test_generate_dataset(self):
+        dataset = generate_dataset(self.spec)
+        self.assertEqual(dataset['users'], 5)
+        self.assertEqual(CustomUser.objects.count(), 5)
+        self.assertEqual(AccessRule.objects.count(), 3 * 8)
+        for model in (Project, Task, Report):
+            self.assertEqual(model.objects.count(), 20)
+
+    def test_generate_dataset_is_deterministic(self):
+        generate_dataset(self.spec)
+        owners = list(Project.objects.order_by('pk').values_list('owner__email', flat=True))
+        # Удаление пользователей, ролей и элементов каскадно удаляет контент и правила
+        CustomUser.objects.all().delete()
+        Role.objects.all().delete()
+        BusinessElement.objects.all().delete()
+        generate_dataset(self.spec)
+        self.assertEqual(list(Project.objects.order_by('pk').values_list('owner__email', flat=True)), owners)
+
+    def test_micro_and_load_report(self):
+        generate_dataset(self.spec)
+        micro = run_micro_benchmarks(number=10, page_size=10)
+        self.assertIn('has_permission', micro['permissions'])
+        self.assertIn('decode_token_cached', micro['jwt'])
+        self.assertEqual(micro['serializers']['projects']['objects'], 10)
+        self.assertIn('query_on_open_connection', micro['connections'])
+
+        load = run_load(requests=3, seed=1)
+        scenario = load['full_access GET /api/v1/projects/']
+        self.assertEqual(scenario['count'], 3)
+        self.assertEqual(scenario['status_codes'], {'200': 3})
+        self.assertIsNotNone(scenario['p99_ms'])
+        self.assertIsNotNone(scenario['queries_per_request'])
+
+    @override_settings(CONTENT_LIST_CACHE_ENABLED=True)
+    def test_load_counts_queries_without_list_cache(self):
+        generate_dataset(self.spec)
+        load = run_load(requests=2, seed=1)
+        # Закешированный список показал бы 0 запросов
+        self.assertGreater(load['full_access GET /api/v1/projects/']['queries_per_request'], 0)
+
+
+class GenerateDataCommandTestCase(TestCase):
+    def generate(self, **options):
+        options = {'users': 30, 'roles': 4, 'rows': 120, 'chunk_size': 50, 'batch_size': 20, **options}
+        call_command('generate_data', stdout=io.StringIO(), **options)
+
+    def test_generates_requested_volume(self):
+        self.generate()
+        self.assertEqual(CustomUser.objects.count(), 30)
+        self.assertEqual(Role.objects.count(), 4)
+        self.assertEqual(CustomUser.roles.through.objects.count(), 30 * 2)
+        for model in (Project, Task, Report):
+            self.assertEqual(model.objects.count(), 120)
+
+    def test_new_roles_invalidate_rbac_caches(self):
+        self.generate()
+        generation = get_rbac_generation()
+        get_permission_matrix()
+        # Бизнес-элементы уже есть - сигналов нет, роли и правила создаются только bulk_create
+        self.generate(prefix='second', users=5, rows=1)
+        self.assertNotEqual(get_rbac_generation(), generation)
+        rule = AccessRule.objects.filter(role__name__startswith='second', read_all_permission=True).first()
+        self.assertTrue(get_permission_matrix().has_permission([rule.role_id], rule.element.name, 'read_all_permission'))
+
+    def test_password_hashed_once_and_usable(self):
+        self.generate(password='secret123')
+        self.assertEqual(CustomUser.objects.values('password_hash').distinct().count(), 1)
+        self.assertTrue(CustomUser.objects.first().check_password('secret123'))
+
+    def test_seed_is_deterministic(self):
+        spec = BulkDataSpec(users=30)
+        self.generate(seed=7)
+        users = generated_user_ids(spec)
+        owners = [users.index(pk) for pk in Project.objects.order_by('title').values_list('owner_id', flat=True)]
+        CustomUser.objects.all().delete()
+        Role.objects.all().delete()
+        self.generate(seed=7)
+        users = generated_user_ids(spec)
+        self.assertEqual(
+            [users.index(pk) for pk in Project.objects.order_by('title').values_list('owner_id', flat=True)], owners
+        )
+
+    def test_skewed_ownership(self):
+        rng = random.Random(1)
+        indexes = [skewed_index(rng, 100, 3.0) for _ in range(10000)]
+        self.assertTrue(all(0 <= index < 100 for index in indexes))
+        share_of_top_decile = sum(index < 10 for index in indexes) / len(indexes)
+        self.assertGreater(share_of_top_decile, 0.4)
@@ -0,0 +1,134 @@
+"""
+Асинхронные (ASGI) версии самых нагруженных эндпоинтов бизнес-данных:
+список, просмотр и удаление объекта.
+
+DRF не поддерживает async-представления, поэтому под ASGI каждый запрос к вьюсету
+уходит в поток. Эти представления - обычные async View Django: аутентификация,
+проверка прав и владения идут через асинхронный ORM (aget, aexists), и медленные
+клиенты не занимают потоки воркера. Формат ответов совпадает с вьюсетами.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from rest_framework.request import Request
+
+from .models import Project, Task, Report
+from .serializers import ProjectSerializer, TaskSerializer, ReportSerializer
+from apps.custom_auth.decorators import require_authentication, require_ownership_or_permission
+from apps.custom_auth.middleware import aget_request_user_id, get_known_role_ids
+from apps.custom_auth.mixins import related_loading_plan
+from apps.custom_auth.permissions import aget_permission_matrix
+from config.pagination import CreatedAtCursorPagination
+
+
+class AsyncContentView(View):
+    """Базовое async-представление: queryset с учетом прав на чтение всех записей"""
+    model = None
+    serializer_class = None
+    lookup_field = 'pk'
+    lookup_url_kwarg = None
+
+    async def aget_queryset(self):
+        user_id = await aget_request_user_id(self.request)
+        role_ids = get_known_role_ids(self.request)
+        if role_ids is not None:
+            # visible_to решает по матрице прав - она должна быть собрана вне event loop
+            await aget_permission_matrix()
+        queryset = self.model.objects.visible_to(user_id, 'read', role_ids)
+
+        select_related, prefetch_related, only = related_loading_plan(self.serializer_class)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if only:
+            queryset = queryset.only(*only)
+        return queryset
+
+    def not_found(self):
+        return JsonResponse({'detail': f'No {self.model._meta.object_name} matches the given query.'}, status=404)
+
+
+class AsyncContentListView(AsyncContentView):
+    http_method_names = ['get']
+
+    @method_decorator(require_authentication)
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.aget_queryset()
+        paginator = CreatedAtCursorPagination()
+        # Курсорная пагинация DRF синхронная; ORM Django все равно выполняет SQL в потоке
+        page = await sync_to_async(paginator.paginate_queryset)(queryset, Request(request))
+        # Связанные объекты уже загружены select_related - сериализация обходится без запросов
+        data = self.serializer_class(page, many=True).data
+        return JsonResponse({
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': data,
+        })
+
+
+class AsyncContentDetailView(AsyncContentView):
+    """Просмотр и удаление объекта; подклассы оборачивают delete проверкой владения"""
+    http_method_names = ['get', 'delete']
+
+    def get_lookup(self, kwargs):
+        return {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+
+    @method_decorator(require_authentication)
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.aget_queryset()
+        obj = await queryset.filter(**self.get_lookup(kwargs)).afirst()
+        if obj is None:
+            return self.not_found()
+        return JsonResponse(self.serializer_class(obj).data)
+
+    async def delete(self, request, *args, **kwargs):
+        queryset = await self.aget_queryset()
+        # Права из claims пропускают проверку существования в декораторе - отсутствие объекта видно здесь
+        deleted, _ = await queryset.filter(**self.get_lookup(kwargs)).adelete()
+        if not deleted:
+            return self.not_found()
+        return HttpResponse(status=204)
+
+
+class AsyncProjectListView(AsyncContentListView):
+    model = Project
+    serializer_class = ProjectSerializer
+
+
+class AsyncProjectDetailView(AsyncContentDetailView):
+    model = Project
+    serializer_class = ProjectSerializer
+
+    @require_ownership_or_permission('projects', 'delete_all_permission', 'owner')
+    async def delete(self, request, *args, **kwargs):
+        return await super().delete(request, *args, **kwargs)
+
+
+class AsyncTaskListView(AsyncContentListView):
+    model = Task
+    serializer_class = TaskSerializer
+
+
+class AsyncTaskDetailView(AsyncContentDetailView):
+    model = Task
+    serializer_class = TaskSerializer
+
+    @require_ownership_or_permission('tasks', 'delete_all_permission', 'assignee')
+    async def delete(self, request, *args, **kwargs):
+        return await super().delete(request, *args, **kwargs)
+
+
+class AsyncReportListView(AsyncContentListView):
+    model = Report
+    serializer_class = ReportSerializer
+
+
+class AsyncReportDetailView(AsyncContentDetailView):
+    model = Report
+    serializer_class = ReportSerializer
+
+    @require_ownership_or_permission('reports', 'delete_all_permission', 'author')
+    async def delete(self, request, *args, **kwargs):
+        return await super().delete(request, *args, **kwargs)
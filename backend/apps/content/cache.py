@@ -0,0 +1,110 @@
+"""
+Кеш ответов списков бизнес-данных.
+
+Ключ ответа - эндпоинт с параметрами запроса, область видимости и версии данных.
+Область видимости одна на всех, у кого есть read_all_permission (администраторы
+и менеджеры получают один и тот же закешированный ответ), и своя у каждого
+пользователя, который видит только свои записи.
+
+Версия данных - счетчик модели в общем для воркеров кеше. Сохранение и удаление
+объекта (сигналы) и пакетные операции увеличивают версию его модели, и ответы,
+собранные по старым данным, больше не находят по ключу - они вытесняются по
+CONTENT_LIST_CACHE_TIMEOUT. Ответ зависит и от моделей вложенных объектов
+(владелец), поэтому в ключ входят и их версии.
+"""
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from apps.custom_auth.mixins import related_loading_plan
+
+VERSION_KEY_PREFIX = 'content:version:'
+
+_deferred = ContextVar('content_deferred_version_bumps', default=None)
+
+
+def _versions_cache():
+    return caches[settings.CONTENT_VERSIONS_CACHE_ALIAS]
+
+
+def _version_key(model):
+    return VERSION_KEY_PREFIX + model._meta.label_lower
+
+
+def get_data_versions(models):
+    """Текущие версии данных моделей (один запрос к кешу)"""
+    cache = _versions_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Начальное значение от времени: после вытеснения ключа версия не совпадет с уже виденными
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def _incr_version(key):
+    cache = _versions_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def _bump_versions(keys, using):
+    for key in keys:
+        _incr_version(key)
+    if transaction.get_connection(using).in_atomic_block:
+        # Запрос, прочитавший старые данные до фиксации, мог сохранить их в кеш уже под новой версией
+        for key in keys:
+            transaction.on_commit(lambda key=key: _incr_version(key), using=using)
+
+
+def bump_data_version(*models, using=DEFAULT_DB_ALIAS):
+    """Увеличивает версии данных моделей; внутри транзакции - еще раз после фиксации"""
+    keys = {_version_key(model) for model in models}
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred.update(keys)
+    else:
+        _bump_versions(keys, using)
+
+
+@contextmanager
+def deferred_version_bumps(using=DEFAULT_DB_ALIAS):
+    """
+    Версии, измененные внутри блока (например, сигналами при удалении пакета
+    объектов), увеличиваются один раз при выходе из блока
+    """
+    keys = set()
+    token = _deferred.set(keys)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        _bump_versions(keys, using)
+
+
+def cached_list_models(serializer_class):
+    """Модель списка и модели вложенных объектов, которые выводит сериализатор"""
+    model = serializer_class.Meta.model
+    models = [model]
+    select_related, prefetch_related, _ = related_loading_plan(serializer_class)
+    for path in select_related + prefetch_related:
+        related = model
+        for name in path.split('__'):
+            related = related._meta.get_field(name).related_model
+        if related not in models:
+            models.append(related)
+    return models
+
+
+def list_cache_key(request, scope, versions):
+    parts = [request.get_host(), request.path, sorted(request.query_params.lists()), scope, versions]
+    return 'content:list:' + hashlib.sha256(repr(parts).encode()).hexdigest()
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Генерация OpenAPI-схемы в файлы openapi.json и openapi.yaml (один раз на деплой)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default=settings.API_SCHEMA_DIR or settings.BASE_DIR / 'schema',
+                            help='Каталог для файлов схемы (по умолчанию API_SCHEMA_DIR)')
+
+    def handle(self, *args, **options):
+        if not settings.API_DOCS_ENABLED:
+            # Не ошибка: команда стоит в цепочке запуска контейнера и с отключенной документацией
+            self.stdout.write(self.style.WARNING('Документация API отключена (API_DOCS_ENABLED=false), схема не создается'))
+            return
+        from config.schema import write_schema_files
+
+        for path in write_schema_files(options['output_dir']):
+            self.stdout.write(self.style.SUCCESS(f'Схема сохранена в {path}'))
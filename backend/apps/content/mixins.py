@@ -0,0 +1,273 @@
+import csv
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.custom_auth.conditional import conditional_response, make_etag
+from apps.custom_auth.decorators import get_bulk_ids
+from apps.custom_auth.middleware import get_known_role_ids, get_request_user, get_request_user_id
+from apps.custom_auth.permissions import has_permission
+from apps.monitoring.metrics import CACHE_REQUESTS
+from config.db_router import use_primary
+
+from .cache import bump_data_version, cached_list_models, deferred_version_bumps, get_data_versions, list_cache_key
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи в буфер"""
+
+    def write(self, value):
+        return value
+
+
+class ResponseCacheMixin:
+    """
+    ETag и условные GET для list() и retrieve(), кеш ответа list() в
+    CONTENT_LIST_CACHE_ALIAS (см. apps.content.cache).
+
+    ETag списка - ключ кеша: область видимости и версии данных, без обращения к БД.
+    ETag объекта - его updated_at и версии моделей вложенных объектов.
+    Права и аутентификация проверяются до обращения к кешу, как и без него
+    """
+
+    def list_cache_scope(self, request):
+        """
+        'all' - общий ответ для всех с read_all_permission, 'own:<id>' - свой для пользователя
+        (свои записи он видит всегда, см. filter_permitted).
+        None, если ролей нет в claims токена: их загрузка стоила бы запроса, а выборка
+        и так проверит правила в подзапросах
+        """
+        user_id = get_request_user_id(request)
+        role_ids = get_known_role_ids(request)
+        if user_id is None or role_ids is None:
+            return None
+        element_name = self.get_serializer_class().Meta.model.rbac_element
+        if has_permission(role_ids, element_name, 'read_all_permission'):
+            return 'all'
+        return f'own:{user_id}'
+
+    def list(self, request, *args, **kwargs):
+        scope = self.list_cache_scope(request)
+        if scope is None or (settings.DATABASE_REPLICAS and not settings.CONTENT_LIST_CACHE_ENABLED):
+            # Без кеша список читается с реплики, которая может отставать от версий данных:
+            # ETag новой версии подтверждал бы устаревшее тело
+            return super().list(request, *args, **kwargs)
+
+        # Версии читаются до выборки: изменение во время запроса уже не совпадет с ключом
+        versions = get_data_versions(cached_list_models(self.get_serializer_class()))
+        key = list_cache_key(request, scope, versions)
+        return conditional_response(request, make_etag(key), partial(self.cached_list, key, request, *args, **kwargs))
+
+    def cached_list(self, key, request, *args, **kwargs):
+        if not settings.CONTENT_LIST_CACHE_ENABLED:
+            return super().list(request, *args, **kwargs)
+
+        cache = caches[settings.CONTENT_LIST_CACHE_ALIAS]
+        data = cache.get(key)
+        CACHE_REQUESTS.inc(cache='content_list', result='hit' if data is not None else 'miss')
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        # Ответ ляжет в кеш под новой версией данных: отстающая реплика сохранила бы в нем старые строки
+        with use_primary():
+            response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.CONTENT_LIST_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        related_versions = get_data_versions(cached_list_models(self.get_serializer_class())[1:])
+        instance = self.get_object()
+        etag = make_etag(instance._meta.label_lower, instance.pk, instance.updated_at, related_versions)
+        return conditional_response(request, etag, lambda: Response(self.get_serializer(instance).data))
+
+
+class ExportMixin:
+    """
+    Потоковая выгрузка всех доступных пользователю записей в NDJSON или CSV.
+    Записи читаются из БД порциями (iterator с серверным курсором на PostgreSQL)
+    и сразу отдаются клиенту, поэтому память не зависит от числа строк.
+    """
+
+    def export_rows(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        for obj in queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            yield serializer.to_representation(obj)
+
+    def stream_ndjson(self, rows):
+        encoder = JSONEncoder(ensure_ascii=False)
+        for row in rows:
+            yield encoder.encode(row) + '\n'
+
+    def stream_csv(self, rows):
+        writer = csv.writer(_Echo())
+        header = [name for name, field in self.get_serializer().fields.items() if not field.write_only]
+        yield writer.writerow(header)
+        for row in rows:
+            # Вложенные объекты (владелец и т.п.) выгружаются своим id
+            yield writer.writerow([
+                value.get('id') if isinstance(value, dict) else value
+                for value in (row.get(name) for name in header)
+            ])
+
+    def export_response(self, request):
+        """Ответ для action export вьюсета"""
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({
+                'error': 'Неподдерживаемый формат выгрузки',
+                'supported_formats': list(EXPORT_FORMATS),
+            }, status=400)
+
+        stream = self.stream_csv if export_format == 'csv' else self.stream_ndjson
+        response = StreamingHttpResponse(stream(self.export_rows()), content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}s.{export_format}"'
+        return response
+
+
+class BulkMixin:
+    """
+    Пакетные создание, обновление и удаление объектов.
+
+    Пакет до BULK_MAX_ITEMS объектов авторизуется один раз декораторами вьюсета
+    (require_permission для создания, require_ownership_or_permission(many=True)
+    для обновления и удаления), сохранение идет через bulk_create/bulk_update
+    в одной транзакции. Если хотя бы один объект не прошел проверку, ничего
+    не сохраняется, а ошибки возвращаются по индексам объектов.
+
+    Вьюсет задает ownership_field (поле владельца).
+    """
+    ownership_field = None
+
+    def get_bulk_items(self, request):
+        """Список объектов из тела запроса или ответ с ошибкой"""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return None, JsonResponse({'error': 'Ожидается непустой список объектов'}, status=400)
+        if len(items) > settings.BULK_MAX_ITEMS:
+            return None, JsonResponse({
+                'error': 'Слишком много объектов в пакете',
+                'max_items': settings.BULK_MAX_ITEMS,
+            }, status=400)
+        return items, None
+
+    def get_bulk_ids(self, items):
+        """Id объектов пакета или ответ с ошибкой"""
+        ids = get_bulk_ids(items)
+        if ids is None:
+            return None, JsonResponse({'error': 'Каждый объект пакета должен иметь целочисленный id'}, status=400)
+        if len(set(ids)) != len(ids):
+            return None, JsonResponse({'error': 'Id в пакете не должны повторяться'}, status=400)
+        return ids, None
+
+    def get_bulk_objects(self, ids):
+        """
+        Загружает объекты пакета одним запросом.
+        Права и владение уже проверены декоратором require_ownership_or_permission(many=True);
+        здесь остаются только ошибки для отсутствующих или недоступных объектов
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        objects = {obj.pk: obj for obj in queryset.filter(pk__in=ids)}
+        errors = [
+            {'index': index, 'id': pk, 'errors': 'Объект не найден'}
+            for index, pk in enumerate(ids) if pk not in objects
+        ]
+        return objects, errors
+
+    def bulk_create_response(self, request):
+        items, error = self.get_bulk_items(request)
+        if error:
+            return error
+
+        serializers = [self.get_serializer(data=item) for item in items]
+        errors = [
+            {'index': index, 'errors': serializer.errors}
+            for index, serializer in enumerate(serializers) if not serializer.is_valid()
+        ]
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_serializer_class().Meta.model
+        owner = get_request_user(request)
+        objects = [
+            model(**serializer.validated_data, **{self.ownership_field: owner})
+            for serializer in serializers
+        ]
+        with transaction.atomic():
+            created = model.objects.bulk_create(objects, batch_size=settings.BULK_BATCH_SIZE)
+            # bulk_create и bulk_update не отправляют сигналы - версия данных меняется явно
+            bump_data_version(model)
+        return Response(self.get_serializer(created, many=True).data, status=status.HTTP_201_CREATED)
+
+    def bulk_update_response(self, request):
+        items, error = self.get_bulk_items(request)
+        if error:
+            return error
+        ids, error = self.get_bulk_ids(items)
+        if error:
+            return error
+
+        objects, errors = self.get_bulk_objects(ids)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializers = [
+            self.get_serializer(objects[pk], data=item, partial=True) for pk, item in zip(ids, items)
+        ]
+        errors = [
+            {'index': index, 'id': pk, 'errors': serializer.errors}
+            for index, (pk, serializer) in enumerate(zip(ids, serializers)) if not serializer.is_valid()
+        ]
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated_fields = set()
+        for serializer in serializers:
+            for attr, value in serializer.validated_data.items():
+                setattr(serializer.instance, attr, value)
+                updated_fields.add(attr)
+
+        instances = [serializer.instance for serializer in serializers]
+        if updated_fields:
+            model = self.get_serializer_class().Meta.model
+            # bulk_update не вызывает pre_save, auto_now поля не обновляются сами
+            now = timezone.now()
+            for instance in instances:
+                instance.updated_at = now
+            updated_fields.add('updated_at')
+            with transaction.atomic():
+                model.objects.bulk_update(instances, sorted(updated_fields), batch_size=settings.BULK_BATCH_SIZE)
+                bump_data_version(model)
+        return Response(self.get_serializer(instances, many=True).data)
+
+    def bulk_destroy_response(self, request):
+        items, error = self.get_bulk_items(request)
+        if error:
+            return error
+        ids, error = self.get_bulk_ids(items)
+        if error:
+            return error
+
+        objects, errors = self.get_bulk_objects(ids)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_serializer_class().Meta.model
+        # Сигнал удаления приходит на каждый объект, версия данных меняется один раз
+        with transaction.atomic(), deferred_version_bumps():
+            model.objects.filter(pk__in=ids).delete()
+        return Response({'deleted': len(ids)})
@@ -2,6 +2,20 @@ from django.db import models
 
 from django.db import models
 from apps.custom_auth.models import CustomUser
+from apps.custom_auth.permissions import filter_permitted
+
+
+class ContentQuerySet(models.QuerySet):
+    """
+    QuerySet бизнес-данных с фильтром по правам доступа.
+    Модель задает rbac_element (бизнес-элемент правил доступа) и ownership_field (поле владельца)
+    """
+
+    def visible_to(self, user, action='read', role_ids=None):
+        """Объекты, над которыми пользователь может выполнить action ('read', 'update', 'delete')"""
+        return filter_permitted(
+            self, getattr(user, 'pk', user), self.model.rbac_element, action, self.model.ownership_field, role_ids
+        )
 
 
 class Project(models.Model):
@@ -18,9 +32,20 @@ class Project(models.Model):
     status = models.CharField(max_length=20, default='active', verbose_name='Статус')
     owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='projects')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    rbac_element = 'projects'
+    ownership_field = 'owner'
+
+    objects = ContentQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Списки "мои проекты" и списки всех записей в порядке курсорной пагинации
+            models.Index(fields=['owner', '-created_at', 'id'], name='project_owner_created_idx'),
+            models.Index(fields=['-created_at', 'id'], name='project_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.owner.email})"
@@ -40,9 +65,20 @@ class Task(models.Model):
     completed = models.BooleanField(default=False, verbose_name='Выполнено')
     assignee = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='tasks')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    rbac_element = 'tasks'
+    ownership_field = 'assignee'
+
+    objects = ContentQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Списки "мои задачи" и списки всех записей в порядке курсорной пагинации
+            models.Index(fields=['assignee', '-created_at', 'id'], name='task_assignee_created_idx'),
+            models.Index(fields=['-created_at', 'id'], name='task_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.assignee.first_name}"
@@ -62,9 +98,20 @@ class Report(models.Model):
     is_published = models.BooleanField(default=False, verbose_name='Опубликован')
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='reports')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    rbac_element = 'reports'
+    ownership_field = 'author'
+
+    objects = ContentQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Списки "мои отчеты" и списки всех записей в порядке курсорной пагинации
+            models.Index(fields=['author', '-created_at', 'id'], name='report_author_created_idx'),
+            models.Index(fields=['-created_at', 'id'], name='report_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.author.first_name}"
@@ -9,7 +9,7 @@ class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = "__all__"
-        read_only_fields = ['owner', 'created_at']
+        read_only_fields = ['owner', 'created_at', 'updated_at']
 
     def create(self, validated_data):
         user = self.context.get('user')
@@ -24,7 +24,7 @@ class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = "__all__"
-        read_only_fields = ['assignee', 'created_at']
+        read_only_fields = ['assignee', 'created_at', 'updated_at']
 
     def create(self, validated_data):
         assignee = self.context.get('user')
@@ -39,7 +39,7 @@ class ReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = Report
         fields = "__all__"
-        read_only_fields = ['author', 'created_at']
+        read_only_fields = ['author', 'created_at', 'updated_at']
 
     def create(self, validated_data):
         author = self.context.get('user')
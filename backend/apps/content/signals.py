@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.custom_auth.models import CustomUser
+
+from .cache import bump_data_version
+from .models import Project, Report, Task
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def data_changed(sender, using, **kwargs):
+    """Изменение объекта (или владельца, которого выводят списки) меняет версию данных модели"""
+    bump_data_version(sender, using=using)
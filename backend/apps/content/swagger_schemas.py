@@ -1,5 +1,4 @@
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from config.api_docs import openapi, swagger_auto_schema
 from .serializers import ProjectSerializer, TaskSerializer, ReportSerializer
 
 # Общие ответы
@@ -41,20 +40,24 @@ project_list_schema = swagger_auto_schema(
             description="Список проектов",
             schema=ProjectSerializer(many=True),
             examples={
-                "application/json": [
-                    {
-                        "id": 1,
-                        "title": "Проект разработки API",
-                        "description": "Создание REST API для системы управления",
-                        "status": "active",
-                        "owner": {
+                "application/json": {
+                    "next": "http://localhost:8000/api/v1/projects/?cursor=cD0yMDI1LTEwLTA0VDEyJTNBMDAlM0EwMFo%3D",
+                    "previous": None,
+                    "results": [
+                        {
                             "id": 1,
-                            "username": "manager",
-                            "first_name": "Менеджер"
-                        },
-                        "created_at": "2025-10-04T12:00:00Z"
-                    }
-                ]
+                            "title": "Проект разработки API",
+                            "description": "Создание REST API для системы управления",
+                            "status": "active",
+                            "owner": {
+                                "id": 1,
+                                "username": "manager",
+                                "first_name": "Менеджер"
+                            },
+                            "created_at": "2025-10-04T12:00:00Z"
+                        }
+                    ]
+                }
             }
         ),
         401: unauthorized_response,
@@ -203,20 +206,24 @@ task_list_schema = swagger_auto_schema(
             description="Список задач",
             schema=TaskSerializer(many=True),
             examples={
-                "application/json": [
-                    {
-                        "id": 1,
-                        "title": "Реализовать аутентификацию",
-                        "description": "Создать систему JWT аутентификации",
-                        "completed": False,
-                        "assignee": {
-                            "id": 2,
-                            "username": "user",
-                            "first_name": "Пользователь"
-                        },
-                        "created_at": "2025-10-04T14:00:00Z"
-                    }
-                ]
+                "application/json": {
+                    "next": "http://localhost:8000/api/v1/tasks/?cursor=cD0yMDI1LTEwLTA0VDEyJTNBMDAlM0EwMFo%3D",
+                    "previous": None,
+                    "results": [
+                        {
+                            "id": 1,
+                            "title": "Реализовать аутентификацию",
+                            "description": "Создать систему JWT аутентификации",
+                            "completed": False,
+                            "assignee": {
+                                "id": 2,
+                                "username": "user",
+                                "first_name": "Пользователь"
+                            },
+                            "created_at": "2025-10-04T14:00:00Z"
+                        }
+                    ]
+                }
             }
         ),
         401: unauthorized_response,
@@ -346,20 +353,24 @@ report_list_schema = swagger_auto_schema(
             description="Список отчетов",
             schema=ReportSerializer(many=True),
             examples={
-                "application/json": [
-                    {
-                        "id": 1,
-                        "title": "Отчет о прогрессе проекта",
-                        "content": "Детальный отчет о выполнении задач...",
-                        "is_published": True,
-                        "author": {
-                            "id": 3,
-                            "username": "manager",
-                            "first_name": "Менеджер"
-                        },
-                        "created_at": "2025-10-04T16:00:00Z"
-                    }
-                ]
+                "application/json": {
+                    "next": "http://localhost:8000/api/v1/reports/?cursor=cD0yMDI1LTEwLTA0VDEyJTNBMDAlM0EwMFo%3D",
+                    "previous": None,
+                    "results": [
+                        {
+                            "id": 1,
+                            "title": "Отчет о прогрессе проекта",
+                            "content": "Детальный отчет о выполнении задач...",
+                            "is_published": True,
+                            "author": {
+                                "id": 3,
+                                "username": "manager",
+                                "first_name": "Менеджер"
+                            },
+                            "created_at": "2025-10-04T16:00:00Z"
+                        }
+                    ]
+                }
             }
         ),
         401: unauthorized_response,
@@ -590,3 +601,128 @@ report_retrieve_schema = swagger_auto_schema(
     tags=['Отчеты']
 )
 
+
+def _export_schema(operation_id, summary, tag):
+    return swagger_auto_schema(
+        operation_id=operation_id,
+        operation_summary=summary,
+        operation_description='''
+    Потоковая выгрузка всех записей, доступных пользователю (те же права, что и у списка).
+    Ответ не разбивается на страницы и передается по мере чтения из базы данных.
+
+    - **ndjson** (по умолчанию): одна JSON-запись на строку
+    - **csv**: заголовок с именами полей, вложенные объекты выгружаются своим id
+    ''',
+        manual_parameters=[
+            openapi.Parameter(
+                'export_format', openapi.IN_QUERY, description='Формат выгрузки',
+                type=openapi.TYPE_STRING, enum=['ndjson', 'csv'], default='ndjson'
+            )
+        ],
+        responses={
+            200: "Поток записей в формате NDJSON или CSV",
+            400: "Неподдерживаемый формат выгрузки",
+            401: unauthorized_response
+        },
+        tags=[tag]
+    )
+
+
+project_export_schema = _export_schema('projects_export', 'Выгрузка проектов', 'Проекты')
+task_export_schema = _export_schema('tasks_export', 'Выгрузка задач', 'Задачи')
+report_export_schema = _export_schema('reports_export', 'Выгрузка отчетов', 'Отчеты')
+
+
+def _bulk_create_schema(operation_id, summary, serializer, tag):
+    return swagger_auto_schema(
+        operation_id=operation_id,
+        operation_summary=summary,
+        operation_description='''
+    Пакетное создание: список объектов (не больше BULK_MAX_ITEMS) в одном запросе.
+    Права проверяются один раз на весь пакет, объекты сохраняются в одной транзакции.
+    Если хотя бы один объект не прошел валидацию, ничего не создается.
+    ''',
+        request_body=serializer(many=True),
+        responses={
+            201: openapi.Response(description="Созданные объекты", schema=serializer(many=True)),
+            400: "Ошибки валидации по индексам объектов",
+            401: unauthorized_response,
+            403: forbidden_response
+        },
+        tags=[tag]
+    )
+
+
+def _bulk_update_schema(operation_id, summary, serializer, tag):
+    return swagger_auto_schema(
+        operation_id=operation_id,
+        operation_summary=summary,
+        operation_description='''
+    Пакетное частичное обновление: список объектов с обязательным полем id.
+    Владение всеми объектами проверяется одной выборкой; без права на все записи
+    можно обновлять только свои. При любой ошибке ничего не сохраняется.
+    ''',
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={'id': openapi.Schema(type=openapi.TYPE_INTEGER)},
+                required=['id'],
+                additional_properties=True
+            )
+        ),
+        responses={
+            200: openapi.Response(description="Обновленные объекты", schema=serializer(many=True)),
+            400: "Ошибки валидации, прав или отсутствующие объекты по индексам",
+            401: unauthorized_response,
+            403: forbidden_response
+        },
+        tags=[tag]
+    )
+
+
+def _bulk_destroy_schema(operation_id, summary, tag):
+    return swagger_auto_schema(
+        operation_id=operation_id,
+        operation_summary=summary,
+        operation_description='''
+    Пакетное удаление: список id объектов. Без права на все записи можно удалять только свои.
+    Если хотя бы один объект недоступен, ничего не удаляется.
+    ''',
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+        responses={
+            200: openapi.Response(
+                description="Число удаленных объектов",
+                examples={"application/json": {"deleted": 2}}
+            ),
+            400: "Недоступные объекты по индексам",
+            401: unauthorized_response,
+            403: forbidden_response
+        },
+        tags=[tag]
+    )
+
+
+project_bulk_create_schema = _bulk_create_schema(
+    'projects_bulk_create', 'Пакетное создание проектов', ProjectSerializer, 'Проекты'
+)
+project_bulk_update_schema = _bulk_update_schema(
+    'projects_bulk_update', 'Пакетное обновление проектов', ProjectSerializer, 'Проекты'
+)
+project_bulk_destroy_schema = _bulk_destroy_schema('projects_bulk_destroy', 'Пакетное удаление проектов', 'Проекты')
+
+task_bulk_create_schema = _bulk_create_schema(
+    'tasks_bulk_create', 'Пакетное создание задач', TaskSerializer, 'Задачи'
+)
+task_bulk_update_schema = _bulk_update_schema(
+    'tasks_bulk_update', 'Пакетное обновление задач', TaskSerializer, 'Задачи'
+)
+task_bulk_destroy_schema = _bulk_destroy_schema('tasks_bulk_destroy', 'Пакетное удаление задач', 'Задачи')
+
+report_bulk_create_schema = _bulk_create_schema(
+    'reports_bulk_create', 'Пакетное создание отчетов', ReportSerializer, 'Отчеты'
+)
+report_bulk_update_schema = _bulk_update_schema(
+    'reports_bulk_update', 'Пакетное обновление отчетов', ReportSerializer, 'Отчеты'
+)
+report_bulk_destroy_schema = _bulk_destroy_schema('reports_bulk_destroy', 'Пакетное удаление отчетов', 'Отчеты')
@@ -1,11 +1,28 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, router
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from drf_yasg.generators import OpenAPISchemaGenerator
 from rest_framework.test import APIClient
 from rest_framework import status
 from apps.custom_auth.models import CustomUser, Role, BusinessElement, AccessRule
+from apps.custom_auth.permissions import get_permission_matrix
+from apps.custom_auth.testing import QueryCountAssertionsMixin
 from apps.content.models import Project, Task, Report
+from config.db_router import reset_replica_health, use_primary
+from config.schema import reset_schema_cache
 
 
-class BusinessEndpointsTestCase(TestCase):
+class BusinessEndpointsTestCase(QueryCountAssertionsMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
         self.setup_roles_and_permissions()
@@ -96,14 +113,30 @@ class BusinessEndpointsTestCase(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
         response = self.client.get('/api/v1/projects/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_projects_list_user(self):
         token = self.get_token('user@test.com', 'user123')
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
         response = self.client.get('/api/v1/projects/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_projects_list_cursor_pagination(self):
+        for index in range(5):
+            Project.objects.create(title=f'Project {index}', description='Bulk', owner=self.admin_user)
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        seen = []
+        url = '/api/v1/projects/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(Project.objects.values_list('id', flat=True)))
 
     def test_projects_create_admin(self):
         token = self.get_token('admin@test.com', 'admin123')
@@ -150,7 +183,7 @@ class BusinessEndpointsTestCase(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
         response = self.client.get('/api/v1/tasks/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_tasks_create_user(self):
         token = self.get_token('user@test.com', 'user123')
@@ -193,6 +226,622 @@ class BusinessEndpointsTestCase(TestCase):
         response = self.client.post('/api/v1/reports/', data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def read_stream(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_projects_export_ndjson_respects_ownership(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/v1/projects/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in self.read_stream(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.user_project.id])
+        self.assertEqual(rows[0]['owner']['email'], 'user@test.com')
+
+    def test_tasks_export_csv(self):
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/v1/tasks/export/?export_format=csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(io.StringIO(self.read_stream(response))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            {row['assignee'] for row in rows}, {str(self.admin_user.id), str(self.regular_user.id)}
+        )
+
+    def test_export_unknown_format(self):
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/v1/reports/export/?export_format=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tasks_bulk_create(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        data = [{'title': f'Imported {index}', 'description': 'Import'} for index in range(3)]
+        response = self.client.post('/api/v1/tasks/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(Task.objects.filter(assignee=self.regular_user, title__startswith='Imported').count(), 3)
+
+    def test_bulk_create_reports_per_item_errors(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        data = [{'title': 'Valid'}, {'description': 'No title'}]
+        response = self.client.post('/api/v1/tasks/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertFalse(Task.objects.filter(title='Valid').exists())
+
+    def test_bulk_create_requires_create_permission(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post('/api/v1/reports/bulk/', [{'title': 'R', 'content': 'C'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_create_rejects_oversized_batch(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with override_settings(BULK_MAX_ITEMS=2):
+            response = self.client.post('/api/v1/tasks/bulk/', [{'title': 'T'}] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_projects_bulk_update_own(self):
+        other_project = Project.objects.create(title='Second', description='Second', owner=self.regular_user)
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        data = [{'id': self.user_project.id, 'status': 'archived'}, {'id': other_project.id, 'title': 'Renamed'}]
+        response = self.client.patch('/api/v1/projects/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user_project.refresh_from_db()
+        other_project.refresh_from_db()
+        self.assertEqual(self.user_project.status, 'archived')
+        self.assertEqual(other_project.title, 'Renamed')
+
+    def test_tasks_bulk_update_not_owned_is_rejected(self):
+        token = self.get_token('manager@test.com', 'manager123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        data = [{'id': self.user_task.id, 'completed': True}]
+        response = self.client.patch('/api/v1/tasks/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json()['denied_ids'], [self.user_task.id])
+        self.user_task.refresh_from_db()
+        self.assertFalse(self.user_task.completed)
+
+    def test_bulk_update_oversized_batch_rejected_before_permission_query(self):
+        token = self.get_token('manager@test.com', 'manager123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        data = [{'id': pk, 'completed': True} for pk in range(1, 4)]
+        get_permission_matrix()  # сборка матрицы прав - разовый расход процесса
+        with override_settings(BULK_MAX_ITEMS=2), self.assertNumQueries(0):
+            response = self.client.patch('/api/v1/tasks/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['max_items'], 2)
+
+    def test_projects_bulk_destroy(self):
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        ids = [self.admin_project.id, self.user_project.id]
+        response = self.client.delete('/api/v1/projects/bulk/', ids, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertFalse(Project.objects.filter(id__in=ids).exists())
+
+    def test_projects_bulk_destroy_other_owner_is_rejected(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        ids = [self.user_project.id, self.admin_project.id]
+        response = self.client.delete('/api/v1/projects/bulk/', ids, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json()['denied_ids'], [self.admin_project.id])
+        self.assertEqual(Project.objects.filter(id__in=ids).count(), 2)
+
+    def test_bulk_ownership_checked_in_one_query(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        projects = Project.objects.bulk_create(
+            Project(title=f'Own {index}', owner=self.regular_user) for index in range(20)
+        )
+        ids = [project.id for project in projects]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete('/api/v1/projects/bulk/', ids, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 20)
+        ownership_queries = [
+            q for q in queries.captured_queries
+            if q['sql'].startswith('SELECT "content_project"."id" AS "pk" FROM')
+        ]
+        self.assertEqual(len(ownership_queries), 1)
+
+    def test_update_ownership_checked_without_loading_owner(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/v1/projects/{self.user_project.id}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        owner_loads = [q for q in queries.captured_queries if '"custom_auth_customuser"."id" =' in q['sql']]
+        self.assertEqual(owner_loads, [])
+
+    def test_update_other_owner_forbidden(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        get_permission_matrix()  # сборка матрицы прав - разовый расход процесса
+        # Чужой проект пользователю не виден - 404, и решается это одним запросом
+        with self.assertNumQueries(1):
+            response = self.client.patch(f'/api/v1/projects/{self.admin_project.id}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.admin_project.refresh_from_db()
+        self.assertNotEqual(self.admin_project.title, 'Renamed')
+
+        # Чужую задачу менеджер видит (read_all), но может менять только свои - 403, тоже одним запросом
+        token = self.get_token('manager@test.com', 'manager123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertNumQueries(1):
+            response = self.client.patch(f'/api/v1/tasks/{self.user_task.id}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.user_task.refresh_from_db()
+        self.assertNotEqual(self.user_task.title, 'Renamed')
+
+    def test_visible_to_matches_permission_matrix(self):
+        users = (self.admin_user, self.manager_user, self.regular_user)
+        for model in (Project, Task, Report):
+            for user in users:
+                role_ids = list(user.roles.values_list('id', flat=True))
+                for action in ('read', 'update', 'delete'):
+                    with self.subTest(model=model.__name__, user=user.email, action=action):
+                        self.assertEqual(
+                            set(model.objects.visible_to(user, action)),
+                            set(model.objects.visible_to(user, action, role_ids)),
+                        )
+        self.assertEqual(list(Project.objects.visible_to(self.regular_user)), [self.user_project])
+        self.assertFalse(Report.objects.visible_to(self.regular_user, 'delete').exists())
+        with self.assertRaises(ValueError):
+            Project.objects.visible_to(self.regular_user, 'create')
+
+    def test_own_rows_visible_without_read_own_permission(self):
+        # Без read_all_permission пользователь видит свои записи, даже если read_own_permission не выдано
+        AccessRule.objects.filter(role=self.user_role, element=self.projects_element).update(read_own_permission=False)
+        for embed_claims in (True, False):
+            with self.subTest(embed_claims=embed_claims), override_settings(JWT_EMBED_AUTHORIZATION_CLAIMS=embed_claims):
+                token = self.get_token('user@test.com', 'user123')
+                self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+                response = self.client.get('/api/v1/projects/')
+                self.assertEqual([item['id'] for item in response.data['results']], [self.user_project.id])
+                response = self.client.patch(f'/api/v1/projects/{self.user_project.id}/', {'status': 'archived'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                response = self.client.patch(f'/api/v1/projects/{self.admin_project.id}/', {'status': 'archived'})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(JWT_EMBED_AUTHORIZATION_CLAIMS=False)
+    def test_list_without_role_claims_checks_rules_in_data_query(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.client.get('/api/v1/projects/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.user_project.id])
+        # Пользователь по email из токена и выборка данных с правилами в подзапросах EXISTS
+        self.assertEqual(len(queries), 2)
+        self.assertIn('EXISTS', queries.captured_queries[1]['sql'])
+
+    @override_settings(JWT_EMBED_AUTHORIZATION_CLAIMS=False)
+    def test_update_without_role_claims_checked_in_one_query(self):
+        token = self.get_token('manager@test.com', 'manager123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.patch(f'/api/v1/tasks/{self.user_task.id}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        own_task = Task.objects.create(title='Manager Task', assignee=self.manager_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/v1/tasks/{own_task.id}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        role_lookups = [q for q in queries.captured_queries if q['sql'].startswith('SELECT "custom_auth_role"')]
+        self.assertEqual(role_lookups, [])
+
+    def test_update_without_own_permission_forbidden(self):
+        report = Report.objects.create(title='User Report', content='Content', author=self.regular_user)
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.patch(f'/api/v1/reports/{report.id}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_unauthenticated_access_forbidden(self):
         response = self.client.get('/api/v1/projects/')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def user_lookups_for_update(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        data = {'title': 'Updated Project'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/v1/projects/{self.user_project.id}/', data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q for q in queries.captured_queries if '"custom_auth_customuser"."email" =' in q['sql']]
+
+    def test_user_not_loaded_with_claims(self):
+        # id пользователя и роли берутся из claims токена
+        self.assertEqual(len(self.user_lookups_for_update()), 0)
+
+    @override_settings(JWT_EMBED_AUTHORIZATION_CLAIMS=False)
+    def test_user_resolved_once_per_request(self):
+        self.assertEqual(len(self.user_lookups_for_update()), 1)
+
+    def create_owners(self, count):
+        return CustomUser.objects.bulk_create(
+            CustomUser(email=f'owner{CustomUser.objects.count() + index}@test.com', first_name='Owner')
+            for index in range(count)
+        )
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        def add_projects(count):
+            Project.objects.bulk_create(
+                Project(title='Project', description='Bulk', owner=owner) for owner in self.create_owners(count)
+            )
+
+        def add_tasks(count):
+            Task.objects.bulk_create(Task(title='Task', assignee=owner) for owner in self.create_owners(count))
+
+        def add_reports(count):
+            Report.objects.bulk_create(
+                Report(title='Report', content='Bulk', author=owner) for owner in self.create_owners(count)
+            )
+
+        self.assertEqual(self.assertListQueriesConstant('/api/v1/projects/', add_projects), 1)
+        self.assertEqual(self.assertListQueriesConstant('/api/v1/tasks/', add_tasks), 1)
+        self.assertEqual(self.assertListQueriesConstant('/api/v1/reports/', add_reports), 1)
+
+
+    def async_request(self, method, path, token):
+        """Запрос через ASGI-обработчик: middleware и представления работают в async-режиме"""
+        request = getattr(self.async_client, method)
+        return async_to_sync(request)(path, headers={'Authorization': f'Bearer {token}'})
+
+    def test_async_projects_list_matches_viewset(self):
+        token = self.get_token('user@test.com', 'user123')
+        response = self.async_request('get', '/api/v1/async/projects/', token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.json(), json.loads(self.client.get('/api/v1/projects/').content))
+
+    def test_async_retrieve_respects_ownership(self):
+        token = self.get_token('user@test.com', 'user123')
+        response = self.async_request('get', f'/api/v1/async/tasks/{self.user_task.id}/', token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['id'], self.user_task.id)
+        response = self.async_request('get', f'/api/v1/async/projects/{self.admin_project.id}/', token)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_delete_checks_ownership(self):
+        token = self.get_token('manager@test.com', 'manager123')
+        response = self.async_request('delete', f'/api/v1/async/projects/{self.user_project.id}/', token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Project.objects.filter(id=self.user_project.id).exists())
+
+        token = self.get_token('user@test.com', 'user123')
+        response = self.async_request('delete', f'/api/v1/async/projects/{self.user_project.id}/', token)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Project.objects.filter(id=self.user_project.id).exists())
+
+    def test_async_delete_missing_object_with_delete_all(self):
+        token = self.get_token('admin@test.com', 'admin123')
+        response = self.async_request('delete', '/api/v1/async/projects/999999/', token)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_unauthenticated_access_forbidden(self):
+        response = async_to_sync(self.async_client.get)('/api/v1/async/projects/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = async_to_sync(self.async_client.get)('/api/v1/async/reports/1/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(CONTENT_LIST_CACHE_ENABLED=True)
+    def test_list_cache_shared_by_read_all_scope(self):
+        cache.clear()
+        admin_token = self.get_token('admin@test.com', 'admin123')
+        manager_token = self.get_token('manager@test.com', 'manager123')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {admin_token}')
+        response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {manager_token}')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data['results']), 2)
+
+        # Другие параметры запроса - другой ключ
+        response = self.client.get('/api/v1/projects/', {'page_size': 1})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    @override_settings(CONTENT_LIST_CACHE_ENABLED=True)
+    def test_list_cache_own_scope_is_per_user(self):
+        cache.clear()
+        other = CustomUser.objects.create(email='other@test.com', first_name='Other')
+        other.set_password('other123')
+        other.save()
+        other.roles.add(self.user_role)
+        user_token = self.get_token('user@test.com', 'user123')
+        other_token = self.get_token('other@test.com', 'other123')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {user_token}')
+        response = self.client.get('/api/v1/projects/')
+        self.assertEqual(len(response.data['results']), 1)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {other_token}')
+        response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 0)
+
+    @override_settings(CONTENT_LIST_CACHE_ENABLED=True)
+    def test_list_cache_invalidated_by_writes(self):
+        cache.clear()
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        def cached_titles():
+            response = self.client.get('/api/v1/tasks/')
+            return response['X-Cache'], sorted(task['title'] for task in response.data['results'])
+
+        self.assertEqual(cached_titles(), ('MISS', ['Admin Task', 'User Task']))
+        self.assertEqual(cached_titles()[0], 'HIT')
+
+        self.user_task.title = 'Renamed Task'
+        self.user_task.save()
+        self.assertEqual(cached_titles(), ('MISS', ['Admin Task', 'Renamed Task']))
+
+        self.client.post('/api/v1/tasks/bulk/', [{'title': 'Bulk Task'}], format='json')
+        self.assertEqual(cached_titles(), ('MISS', ['Admin Task', 'Bulk Task', 'Renamed Task']))
+        self.assertEqual(cached_titles()[0], 'HIT')
+
+        data = [{'id': self.admin_task.id, 'title': 'Bulk Renamed'}]
+        self.client.patch('/api/v1/tasks/bulk/', data, format='json')
+        self.assertEqual(cached_titles(), ('MISS', ['Bulk Renamed', 'Bulk Task', 'Renamed Task']))
+
+        self.client.delete('/api/v1/tasks/bulk/', [{'id': self.admin_task.id}], format='json')
+        self.assertEqual(cached_titles(), ('MISS', ['Bulk Task', 'Renamed Task']))
+
+        # Владелец выводится в списке: его изменение тоже сбрасывает кеш
+        self.assertEqual(cached_titles()[0], 'HIT')
+        self.regular_user.first_name = 'Renamed'
+        self.regular_user.save()
+        self.assertEqual(cached_titles()[0], 'MISS')
+
+    @override_settings(CONTENT_LIST_CACHE_ENABLED=True)
+    def test_list_cache_does_not_bypass_permissions(self):
+        cache.clear()
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/v1/reports/')['X-Cache'], 'MISS')
+
+        self.client.credentials()
+        response = self.client.get('/api/v1/reports/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        AccessRule.objects.filter(role=self.user_role, element=self.reports_element).delete()
+        user_report = Report.objects.create(title='User Report', content='Content', author=self.regular_user)
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/v1/reports/')
+        # Без read_all_permission - свой ключ и только свои записи, а не общий ответ администратора
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([item['id'] for item in response.data['results']], [user_report.id])
+
+    def test_list_conditional_get(self):
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/v1/projects/')
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/projects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # Менеджер видит те же записи - тот же ETag; пользователь со своими записями - другой
+        token = self.get_token('manager@test.com', 'manager123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/v1/projects/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/v1/projects/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.admin_project.status = 'archived'
+        self.admin_project.save()
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/v1/projects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_retrieve_conditional_get_uses_updated_at(self):
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        url = f'/api/v1/tasks/{self.user_task.id}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('updated_at', response.data)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        updated_at = Task.objects.get(id=self.user_task.id).updated_at
+        data = [{'id': self.user_task.id, 'completed': True}]
+        self.assertEqual(self.client.patch('/api/v1/tasks/bulk/', data, format='json').status_code, 200)
+        self.assertGreater(Task.objects.get(id=self.user_task.id).updated_at, updated_at)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['completed'])
+
+        # Чужой объект не раскрывается ни телом, ни 304
+        response = self.client.get(f'/api/v1/tasks/{self.admin_task.id}/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTestCase(TransactionTestCase):
+    """Реплика в тестах - зеркало тестовой базы default (TransactionTestCase: данные зафиксированы)"""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        reset_replica_health()
+        role = Role.objects.create(name='user')
+        element = BusinessElement.objects.create(name='projects')
+        AccessRule.objects.create(role=role, element=element, read_own_permission=True, create_permission=True)
+        self.user = CustomUser.objects.create(email='user@test.com', first_name='User')
+        self.user.roles.add(role)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.user.generate_jwt_token()}')
+
+    def test_router_decisions(self):
+        self.assertEqual(router.db_for_read(Project), 'replica')
+        self.assertEqual(router.db_for_read(AccessRule), 'replica')
+        self.assertEqual(router.db_for_write(Project), 'default')
+        with use_primary():
+            self.assertEqual(router.db_for_read(Project), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'content'))
+
+    def test_reads_from_replica_until_client_writes(self):
+        Project.objects.create(title='Existing', description='', owner=self.user)
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertGreater(len(replica_queries), 0)
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.post('/api/v1/projects/', {'title': 'New', 'description': 'Created'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica_queries), 0)
+        self.assertIn('db_primary_until', response.cookies)
+
+        # Клиент видит свою запись: следующие чтения идут в основную БД
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get('/api/v1/projects/')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(len(replica_queries), 0)
+
+    @override_settings(CONTENT_LIST_CACHE_ENABLED=True)
+    def test_cached_list_is_filled_from_primary(self):
+        cache.clear()
+        # Очистка кеша сбросила и поколение RBAC - нужен токен с актуальными claims
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.user.generate_jwt_token()}')
+        Project.objects.create(title='Existing', description='', owner=self.user)
+        # Версия данных уже новая, а реплика может отставать: кешируемый ответ читается из default
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(len(replica_queries), 0)
+        self.assertIn('ETag', response)
+
+        # Обычные чтения по-прежнему идут на реплику
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.client.get(f'/api/v1/projects/{response.data["results"][0]["id"]}/')
+        self.assertGreater(len(replica_queries), 0)
+
+    def test_list_from_replica_has_no_etag(self):
+        Project.objects.create(title='Existing', description='', owner=self.user)
+        response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        replica = connections['replica']
+        replica.close()
+        with mock.patch.object(replica, 'ensure_connection', side_effect=OperationalError('down')) as connect, \
+                self.assertLogs('config.db_router', 'WARNING'):
+            self.assertEqual(router.db_for_read(Project), 'default')
+            self.assertEqual(router.db_for_read(Project), 'default')
+        # Недоступная реплика не проверяется повторно до REPLICA_RETRY_SECONDS
+        self.assertEqual(connect.call_count, 1)
+        response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Проверка плана запроса написана для PostgreSQL')
+class ContentIndexesTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(email='user@test.com', first_name='User')
+        self.role = Role.objects.create(name='user')
+        self.element = BusinessElement.objects.create(name='projects')
+        AccessRule.objects.create(role=self.role, element=self.element, read_own_permission=True)
+        with connection.cursor() as cursor:
+            # На маленьких таблицах планировщик всегда выбирает seq scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_owner_lists_use_composite_indexes(self):
+        ordering = ('-created_at', 'id')
+        self.assertUsesIndex(
+            Project.objects.filter(owner=self.user).order_by(*ordering), 'project_owner_created_idx'
+        )
+        self.assertUsesIndex(
+            Task.objects.filter(assignee=self.user).order_by(*ordering), 'task_assignee_created_idx'
+        )
+        self.assertUsesIndex(
+            Report.objects.filter(author=self.user).order_by(*ordering), 'report_author_created_idx'
+        )
+
+    def test_access_rule_lookup_uses_covering_index(self):
+        self.assertUsesIndex(
+            AccessRule.objects.filter(element=self.element, role=self.role).values('read_all_permission'),
+            'accessrule_element_role_cov_idx'
+        )
+
+
+class ApiSchemaTestCase(TestCase):
+    def setUp(self):
+        reset_schema_cache()
+        self.addCleanup(reset_schema_cache)
+
+    def test_schema_generated_once_and_served_with_etag(self):
+        with mock.patch.object(OpenAPISchemaGenerator, 'get_schema', autospec=True,
+                               side_effect=OpenAPISchemaGenerator.get_schema) as get_schema:
+            response = self.client.get('/swagger.json/')
+            self.client.get('/swagger.yaml/')
+            self.client.get('/swagger.json/')
+        self.assertEqual(get_schema.call_count, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('/v1/projects/', json.loads(response.content)['paths'])
+
+        response = self.client.get('/swagger.json/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get('/swagger.xml/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_generate_schema_command_output_is_served(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('generate_schema', output_dir=directory, stdout=io.StringIO())
+            with open(os.path.join(directory, 'openapi.yaml'), 'rb') as file:
+                content = file.read()
+            with override_settings(API_SCHEMA_DIR=directory), \
+                    mock.patch.object(OpenAPISchemaGenerator, 'get_schema') as get_schema:
+                response = self.client.get('/swagger.yaml/')
+        get_schema.assert_not_called()
+        self.assertEqual(response.content, content)
+        self.assertEqual(response['Content-Type'], 'application/yaml')
+
+    def test_generate_schema_command_skips_when_docs_disabled(self):
+        stdout = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory, override_settings(API_DOCS_ENABLED=False):
+            call_command('generate_schema', output_dir=directory, stdout=stdout)
+            self.assertEqual(os.listdir(directory), [])
+        self.assertIn('API_DOCS_ENABLED=false', stdout.getvalue())
+
+    def test_swagger_ui_loads_cached_schema(self):
+        response = self.client.get('/swagger/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('/swagger.json/', response.content.decode())
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 
 router = DefaultRouter()
@@ -13,5 +13,12 @@ app_name = 'content'
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Асинхронные версии списка, просмотра и удаления для запуска под ASGI
+    path('async/projects/', async_views.AsyncProjectListView.as_view(), name='async-project-list'),
+    path('async/projects/<int:pk>/', async_views.AsyncProjectDetailView.as_view(), name='async-project-detail'),
+    path('async/tasks/', async_views.AsyncTaskListView.as_view(), name='async-task-list'),
+    path('async/tasks/<int:pk>/', async_views.AsyncTaskDetailView.as_view(), name='async-task-detail'),
+    path('async/reports/', async_views.AsyncReportListView.as_view(), name='async-report-list'),
+    path('async/reports/<int:pk>/', async_views.AsyncReportDetailView.as_view(), name='async-report-detail'),
 ]
 
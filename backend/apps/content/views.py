@@ -1,48 +1,37 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from .mixins import BulkMixin, ExportMixin, ResponseCacheMixin
 from .models import Project, Task, Report
 from .serializers import ProjectSerializer, TaskSerializer, ReportSerializer
 from apps.custom_auth.decorators import require_authentication, require_permission, require_ownership_or_permission
-from apps.custom_auth.models import AccessRule, CustomUser
+from apps.custom_auth.mixins import RelatedLoadingMixin
+from apps.custom_auth.middleware import get_known_role_ids, get_request_user, get_request_user_id
 from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from .swagger_schemas import *
 
 
 @method_decorator(require_authentication, name='dispatch')
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ResponseCacheMixin, BulkMixin, ExportMixin, RelatedLoadingMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
+    ownership_field = 'owner'
 
     def get_queryset(self):
         try:
             self.email = self.request.email
         except AttributeError:
             self.email = None
-        try:
-            user = CustomUser.objects.get(email=self.request.email, is_active=True)
-        except CustomUser.DoesNotExist:
-            return Project.objects.none()
-
-        user_roles = user.roles.all()
-
-        has_read_all = AccessRule.objects.filter(
-            role__in=user_roles,
-            element__name='projects',
-            read_all_permission=True
-        ).exists()
-
-        if has_read_all:
-            return Project.objects.all()
-        else:
-            return Project.objects.filter(owner=user)
+        # Роли и правила не загружаются отдельными запросами - см. ContentQuerySet.visible_to
+        return Project.objects.visible_to(
+            get_request_user_id(self.request), 'read', get_known_role_ids(self.request)
+        )
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        if hasattr(self.request, 'email') and self.request.email:
-            try:
-                context['user'] = CustomUser.objects.get(email=self.request.email)
-            except CustomUser.DoesNotExist:
-                pass
+        # Пользователь загружается из БД только если сериализатору он действительно нужен
+        context['user'] = SimpleLazyObject(lambda: get_request_user(self.request))
         return context
 
     @project_list_schema
@@ -53,6 +42,29 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
+    @project_export_schema
+    @action(detail=False, methods=['get'], url_path='export', pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        return self.export_response(request)
+
+    @project_bulk_create_schema
+    @action(detail=False, methods=['post'], url_path='bulk', pagination_class=None)
+    @require_permission('projects', 'create_permission')
+    def bulk_create(self, request, *args, **kwargs):
+        return self.bulk_create_response(request)
+
+    @project_bulk_update_schema
+    @bulk_create.mapping.patch
+    @require_ownership_or_permission('projects', 'update_all_permission', 'owner', many=True)
+    def bulk_update(self, request, *args, **kwargs):
+        return self.bulk_update_response(request)
+
+    @project_bulk_destroy_schema
+    @bulk_create.mapping.delete
+    @require_ownership_or_permission('projects', 'delete_all_permission', 'owner', many=True)
+    def bulk_destroy(self, request, *args, **kwargs):
+        return self.bulk_destroy_response(request)
+
     @project_create_schema
     @require_permission('projects', 'create_permission')
     def create(self, request, *args, **kwargs):
@@ -75,35 +87,20 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
 
 @method_decorator(require_authentication, name='dispatch')
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ResponseCacheMixin, BulkMixin, ExportMixin, RelatedLoadingMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
+    ownership_field = 'assignee'
 
     def get_queryset(self):
-        try:
-            user = CustomUser.objects.get(email=self.request.email, is_active=True)
-        except CustomUser.DoesNotExist:
-            return Task.objects.none()
-
-        user_roles = user.roles.all()
-
-        has_read_all = AccessRule.objects.filter(
-            role__in=user_roles,
-            element__name='tasks',
-            read_all_permission=True
-        ).exists()
-
-        if has_read_all:
-            return Task.objects.all()
-        else:
-            return Task.objects.filter(assignee=user)
+        # Роли и правила не загружаются отдельными запросами - см. ContentQuerySet.visible_to
+        return Task.objects.visible_to(
+            get_request_user_id(self.request), 'read', get_known_role_ids(self.request)
+        )
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        if hasattr(self.request, 'email') and self.request.email:
-            try:
-                context['user'] = CustomUser.objects.get(email=self.request.email)
-            except CustomUser.DoesNotExist:
-                pass
+        # Пользователь загружается из БД только если сериализатору он действительно нужен
+        context['user'] = SimpleLazyObject(lambda: get_request_user(self.request))
         return context
 
     @task_list_schema
@@ -114,6 +111,29 @@ class TaskViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
+    @task_export_schema
+    @action(detail=False, methods=['get'], url_path='export', pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        return self.export_response(request)
+
+    @task_bulk_create_schema
+    @action(detail=False, methods=['post'], url_path='bulk', pagination_class=None)
+    @require_permission('tasks', 'create_permission')
+    def bulk_create(self, request, *args, **kwargs):
+        return self.bulk_create_response(request)
+
+    @task_bulk_update_schema
+    @bulk_create.mapping.patch
+    @require_ownership_or_permission('tasks', 'update_all_permission', 'assignee', many=True)
+    def bulk_update(self, request, *args, **kwargs):
+        return self.bulk_update_response(request)
+
+    @task_bulk_destroy_schema
+    @bulk_create.mapping.delete
+    @require_ownership_or_permission('tasks', 'delete_all_permission', 'assignee', many=True)
+    def bulk_destroy(self, request, *args, **kwargs):
+        return self.bulk_destroy_response(request)
+
     @task_create_schema
     @require_permission('tasks', 'create_permission')
     def create(self, request, *args, **kwargs):
@@ -136,35 +156,20 @@ class TaskViewSet(viewsets.ModelViewSet):
 
 
 @method_decorator(require_authentication, name='dispatch')
-class ReportViewSet(viewsets.ModelViewSet):
+class ReportViewSet(ResponseCacheMixin, BulkMixin, ExportMixin, RelatedLoadingMixin, viewsets.ModelViewSet):
     serializer_class = ReportSerializer
+    ownership_field = 'author'
 
     def get_queryset(self):
-        try:
-            user = CustomUser.objects.get(email=self.request.email, is_active=True)
-        except CustomUser.DoesNotExist:
-            return Report.objects.none()
-
-        user_roles = user.roles.all()
-
-        has_read_all = AccessRule.objects.filter(
-            role__in=user_roles,
-            element__name='reports',
-            read_all_permission=True
-        ).exists()
-
-        if has_read_all:
-            return Report.objects.all()
-        else:
-            return Report.objects.filter(author=user)
+        # Роли и правила не загружаются отдельными запросами - см. ContentQuerySet.visible_to
+        return Report.objects.visible_to(
+            get_request_user_id(self.request), 'read', get_known_role_ids(self.request)
+        )
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        if hasattr(self.request, 'email') and self.request.email:
-            try:
-                context['user'] = CustomUser.objects.get(email=self.request.email)
-            except CustomUser.DoesNotExist:
-                pass
+        # Пользователь загружается из БД только если сериализатору он действительно нужен
+        context['user'] = SimpleLazyObject(lambda: get_request_user(self.request))
         return context
 
     @report_list_schema
@@ -175,6 +180,29 @@ class ReportViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
+    @report_export_schema
+    @action(detail=False, methods=['get'], url_path='export', pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        return self.export_response(request)
+
+    @report_bulk_create_schema
+    @action(detail=False, methods=['post'], url_path='bulk', pagination_class=None)
+    @require_permission('reports', 'create_permission')
+    def bulk_create(self, request, *args, **kwargs):
+        return self.bulk_create_response(request)
+
+    @report_bulk_update_schema
+    @bulk_create.mapping.patch
+    @require_ownership_or_permission('reports', 'update_all_permission', 'author', many=True)
+    def bulk_update(self, request, *args, **kwargs):
+        return self.bulk_update_response(request)
+
+    @report_bulk_destroy_schema
+    @bulk_create.mapping.delete
+    @require_ownership_or_permission('reports', 'delete_all_permission', 'author', many=True)
+    def bulk_destroy(self, request, *args, **kwargs):
+        return self.bulk_destroy_response(request)
+
     @report_create_schema
     @require_permission('reports', 'create_permission')
     def create(self, request, *args, **kwargs):
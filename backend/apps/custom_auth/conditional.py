@@ -0,0 +1,65 @@
+"""
+Условные GET (ETag / If-None-Match) для эндпоинтов API.
+
+ETag считается до выборки и сериализации из дешевых признаков версии данных
+(поколение RBAC, версии моделей, updated_at объекта). Если клиент прислал
+совпадающий If-None-Match, отдается 304 без тела - queryset не выполняется
+и сериализатор не вызывается.
+"""
+import hashlib
+from functools import partial
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .permissions import get_rbac_generation
+
+
+def make_etag(*parts):
+    """Сильный ETag по значениям, от которых зависит ответ"""
+    return quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:32])
+
+
+def add_etag(response, etag):
+    response['ETag'] = etag
+    # Ответ зависит от токена: клиент хранит его у себя и сверяет ETag, общие кеши - нет
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def not_modified(request, etag):
+    """Ответ 304 (или 412 для If-Match), если условие запроса выполнено; иначе None"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        add_etag(response, etag)
+    return response
+
+
+def conditional_response(request, etag, get_response):
+    """Ответ get_response() с ETag или 304, если у клиента уже актуальная версия"""
+    response = not_modified(request, etag)
+    if response is None:
+        response = get_response()
+        if response.status_code == 200:
+            add_etag(response, etag)
+    return response
+
+
+class RbacETagMixin:
+    """
+    ETag для list/retrieve справочников RBAC (роли, правила, бизнес-элементы).
+    Любое их изменение меняет поколение RBAC, поэтому оно и служит версией ответа.
+    Права проверяются декораторами вьюсета до вызова этих методов
+    """
+
+    def rbac_etag(self, request):
+        return make_etag(request.get_full_path(), get_rbac_generation())
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(request, self.rbac_etag(request), partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request, self.rbac_etag(request), partial(super().retrieve, request, *args, **kwargs)
+        )
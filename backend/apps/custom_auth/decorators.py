@@ -1,114 +1,229 @@
 from functools import wraps
-from django.http import JsonResponse
-from .models import AccessRule, CustomUser
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Exists, OuterRef
+from django.http import Http404, JsonResponse
+from apps.monitoring.metrics import PERMISSION_CHECKS
+from .middleware import (
+    aget_request_role_ids,
+    aget_request_user_id,
+    get_known_role_ids,
+    get_request_role_ids,
+    get_request_user_id,
+)
+from .permissions import ahas_permission, filter_permitted, has_permission
+
+# Декораторы ниже работают и с синхронными, и с асинхронными (async def) представлениями:
+# для корутин проверки выполняются через асинхронный ORM без переключения в поток
+
+
+def authentication_error(request):
+    """Ответ 401 для запроса без действительного токена, иначе None"""
+    if not hasattr(request, 'email') or not request.email:
+        return JsonResponse({
+            'error': 'Требуется авторизация',
+            'message': 'Для доступа к этому ресурсу необходимо предоставить действительный JWT токен',
+            'code': 'AUTHENTICATION_REQUIRED'
+        }, status=401)
+    return None
 
 
 def require_authentication(view_func):
     """Декоратор для проверки аутентификации"""
 
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            return authentication_error(request) or await view_func(request, *args, **kwargs)
+
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if not hasattr(request, 'email') or not request.email:
-            return JsonResponse({
-                'error': 'Требуется авторизация',
-                'message': 'Для доступа к этому ресурсу необходимо предоставить действительный JWT токен',
-                'code': 'AUTHENTICATION_REQUIRED'
-            }, status=401)
-        return view_func(request, *args, **kwargs)
+        return authentication_error(request) or view_func(request, *args, **kwargs)
 
     return wrapper
 
 
+def permission_error(user_id, user_role_ids, allowed, element_name, permission_type):
+    """Ответ с ошибкой проверки прав на ресурс или None, если доступ разрешен"""
+    if user_id is None:
+        return JsonResponse({'error': 'Пользователь не найден'}, status=401)
+    if not user_role_ids:
+        return JsonResponse({
+            'error': 'У пользователя нет назначенных ролей'
+        }, status=403)
+    if not allowed:
+        return JsonResponse({
+            'error': 'Доступ запрещен',
+            'message': f'У вас не достаточно для доступа к ресурсу',
+            'required_permission': permission_type,
+            'resource': element_name
+        }, status=403)
+    return None
+
+
 def require_permission(element_name, permission_type):
     """Декоратор для проверки прав доступа к ресурсу"""
 
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not hasattr(request.request, 'email') or not request.request.email:
+                    return JsonResponse({'error': 'Требуется авторизация'}, status=401)
+                user_id = await aget_request_user_id(request.request)
+                user_role_ids = await aget_request_role_ids(request.request) if user_id is not None else []
+                allowed = bool(user_role_ids) and await ahas_permission(user_role_ids, element_name, permission_type)
+                error = permission_error(user_id, user_role_ids, allowed, element_name, permission_type)
+                PERMISSION_CHECKS.inc(element=element_name, permission=permission_type,
+                                      result='deny' if error else 'allow')
+                return error or await view_func(request, *args, **kwargs)
+
+            return async_wrapper
+
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
             if not hasattr(request.request, 'email') or not request.request.email:
                 return JsonResponse({'error': 'Требуется авторизация'}, status=401)
-            try:
-                user = CustomUser.objects.get(email=request.request.email, is_active=True)
-            except CustomUser.DoesNotExist:
-                return JsonResponse({'error': 'Пользователь не найден'}, status=401)
-
-            # Получаем роли пользователя через ManyToMany
-            user_roles = user.roles.all()
+            user_id = get_request_user_id(request.request)
+            # Роли пользователя загружаются один раз на запрос
+            user_role_ids = get_request_role_ids(request.request) if user_id is not None else []
+            allowed = bool(user_role_ids) and has_permission(user_role_ids, element_name, permission_type)
+            error = permission_error(user_id, user_role_ids, allowed, element_name, permission_type)
+            PERMISSION_CHECKS.inc(element=element_name, permission=permission_type, result='deny' if error else 'allow')
+            return error or view_func(request, *args, **kwargs)
 
-            if not user_roles.exists():
-                return JsonResponse({
-                    'error': 'У пользователя нет назначенных ролей'
-                }, status=403)
+        return wrapper
 
-            has_permission = AccessRule.objects.filter(
-                role__in=user_roles,
-                element__name=element_name,
-                **{permission_type: True}
-            ).exists()
+    return decorator
 
-            if not has_permission:
-                return JsonResponse({
-                    'error': 'Доступ запрещен',
-                    'message': f'У вас не достаточно для доступа к ресурсу',
-                    'required_permission': permission_type,
-                    'resource': element_name
-                }, status=403)
 
-            return view_func(request, *args, **kwargs)
+def get_bulk_ids(data):
+    """Id из тела пакетного запроса: список id или список объектов с полем id"""
+    if not isinstance(data, list):
+        return None
+    ids = [item.get('id') if isinstance(item, dict) else item for item in data]
+    if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+        return None
+    return ids
 
-        return wrapper
 
-    return decorator
+def permitted_flag(queryset, lookup, user_id, element_name, action, ownership_field, role_ids):
+    """
+    Один запрос: [True] - объект доступен для action, [False] - объект виден, но действие
+    запрещено, [] - объекта нет среди видимых пользователю (queryset)
+    """
+    permitted = filter_permitted(
+        queryset.model._default_manager.filter(pk=OuterRef('pk')),
+        user_id, element_name, action, ownership_field, role_ids,
+    )
+    return queryset.filter(**lookup).annotate(_permitted=Exists(permitted)).values_list('_permitted', flat=True)
 
 
-def require_ownership_or_permission(element_name, permission_type, ownership_field):
+def require_ownership_or_permission(element_name, permission_type, ownership_field, many=False):
     """
     Декоратор для проверки владения объектом ИЛИ специального разрешения
 
+    Права и владение проверяются через filter_permitted: по матрице прав, если роли
+    известны из токена, иначе подзапросами EXISTS в том же SQL, что и поиск объекта.
+    Ни объект, ни связанный пользователь не загружаются.
+
     Args:
         element_name: Название бизнес-элемента
         permission_type: Тип разрешения (например, update_all_permission)
         ownership_field: Поле для проверки владения (например, 'owner', 'assignee', 'author')
+        many: Пакетная операция - id объектов берутся из тела запроса,
+              права на все объекты проверяются одним запросом
+
+    Асинхронное представление должно определять aget_queryset(); пакетный режим
+    поддерживается только для синхронных вьюсетов DRF (request.data).
     """
+    action = permission_type.split('_', 1)[0]
+    forbidden = {
+        'error': 'Доступ запрещен',
+        'message': f'У вас не достаточно для доступа к ресурсу',
+    }
 
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            if many:
+                raise ImproperlyConfigured('Пакетная проверка владения доступна только синхронным вьюсетам')
+
+            @wraps(view_func)
+            async def async_wrapper(self, request, *args, **kwargs):
+                if not hasattr(request, 'email') or not request.email:
+                    return JsonResponse({'error': 'Требуется авторизация'}, status=401)
+
+                user_id = await aget_request_user_id(request)
+                if user_id is None:
+                    return JsonResponse({'error': 'Пользователь не найден'}, status=401)
+
+                role_ids = get_known_role_ids(request)
+                if role_ids is not None and await ahas_permission(role_ids, element_name, permission_type):
+                    return await view_func(self, request, *args, **kwargs)
+
+                queryset = await self.aget_queryset()
+                lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+                allowed = await permitted_flag(
+                    queryset, {self.lookup_field: kwargs[lookup_url_kwarg]},
+                    user_id, element_name, action, ownership_field, role_ids,
+                ).afirst()
+                if allowed is None:
+                    return JsonResponse({'detail': 'Не найдено.'}, status=404)
+                if allowed:
+                    return await view_func(self, request, *args, **kwargs)
+                return JsonResponse(forbidden, status=403)
+
+            return async_wrapper
+
         @wraps(view_func)
         def wrapper(self, request, *args, **kwargs):
             if not hasattr(request, 'email') or not request.email:
                 return JsonResponse({'error': 'Требуется авторизация'}, status=401)
 
-            try:
-                user = CustomUser.objects.get(email=request.email, is_active=True)
-            except CustomUser.DoesNotExist:
+            user_id = get_request_user_id(request)
+            if user_id is None:
                 return JsonResponse({'error': 'Пользователь не найден'}, status=401)
 
-            obj = self.get_object()
-            user_roles = user.roles.all()
-
-            has_all_permission = AccessRule.objects.filter(
-                role__in=user_roles,
-                element__name=element_name,
-                **{permission_type: True}
-            ).exists()
-
-            if has_all_permission:
+            # Роли из токена позволяют решить по матрице прав без запросов к БД
+            role_ids = get_known_role_ids(request)
+            if role_ids is not None and has_permission(role_ids, element_name, permission_type):
                 return view_func(self, request, *args, **kwargs)
 
-            # Проверяем права на свои объекты + владение
-            own_permission_type = permission_type.replace('_all_', '_own_')
-            has_own_permission = AccessRule.objects.filter(
-                role__in=user_roles,
-                element__name=element_name,
-                **{own_permission_type: True}
-            ).exists()
-
-            if has_own_permission and getattr(obj, ownership_field) == user:
+            queryset = self.get_queryset()
+
+            if many:
+                ids = get_bulk_ids(request.data)
+                if ids is None:
+                    return JsonResponse({'error': 'Ожидается список объектов с целочисленными id'}, status=400)
+                # Размер пакета проверяется до запроса прав: иначе pk__in не ограничен
+                if len(ids) > settings.BULK_MAX_ITEMS:
+                    return JsonResponse({
+                        'error': 'Слишком много объектов в пакете',
+                        'max_items': settings.BULK_MAX_ITEMS,
+                    }, status=400)
+                permitted = filter_permitted(
+                    queryset.filter(pk__in=ids), user_id, element_name, action, ownership_field, role_ids
+                )
+                denied_ids = sorted(set(ids) - set(permitted.values_list('pk', flat=True)))
+                if not denied_ids:
+                    return view_func(self, request, *args, **kwargs)
+                return JsonResponse({**forbidden, 'denied_ids': denied_ids}, status=403)
+
+            # Как и get_object: недоступный пользователю объект - 404
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            allowed = list(permitted_flag(
+                queryset, {self.lookup_field: kwargs[lookup_url_kwarg]},
+                user_id, element_name, action, ownership_field, role_ids,
+            )[:1])
+            if not allowed:
+                raise Http404
+            if allowed[0]:
                 return view_func(self, request, *args, **kwargs)
 
-            return JsonResponse({
-                'error': 'Доступ запрещен',
-                'message': f'У вас не достаточно для доступа к ресурсу',
-            }, status=403)
+            return JsonResponse(forbidden, status=403)
 
         return wrapper
 
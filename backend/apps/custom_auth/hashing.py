@@ -0,0 +1,57 @@
+"""
+Ограниченный пул потоков для bcrypt.
+
+Хеширование и проверка пароля занимают сотни миллисекунд CPU. Пул ограничивает
+число одновременных bcrypt-операций в процессе и длину очереди к ним: при
+переполнении запрос сразу получает отказ (503). bcrypt освобождает GIL, поэтому
+потоков достаточно.
+
+run() держит поток запроса до конца хеширования, поэтому мест в пуле
+(PASSWORD_HASHING_WORKERS + PASSWORD_HASHING_QUEUE_SIZE) должно быть меньше, чем
+потоков воркера gunicorn - тогда остальные эндпоинты сохраняют свободные потоки.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class HashingPoolSaturated(Exception):
+    """В пуле нет свободных мест - запрос нужно отклонить"""
+
+
+class HashingPool:
+    def __init__(self, max_workers, max_pending):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        # Выполняющиеся задачи + ожидающие в очереди
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, fn, *args):
+        """Ставит задачу в пул или сразу бросает HashingPoolSaturated"""
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """Выполняет задачу в пуле и ждет результат"""
+        return self.submit(fn, *args).result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    """Пул хеширования текущего процесса"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE_SIZE)
+    return _pool
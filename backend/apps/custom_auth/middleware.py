@@ -1,24 +1,157 @@
 import jwt
-from django.conf import settings
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 
 from apps.custom_auth.models import CustomUser
+from apps.custom_auth.permissions import aget_role_ids, get_role_ids, sync_permission_matrix
+from apps.custom_auth.token_cache import decode_token
+from apps.monitoring.metrics import JWT_DECODE_FAILURES
+
+
+def get_request_user(request):
+    """
+    Активный пользователь запроса по email из JWT.
+    Загружается один раз и кешируется на исходном HttpRequest,
+    поэтому декораторы и вьюсеты разделяют один и тот же объект.
+    """
+    request = getattr(request, '_request', request)
+    if request is None:
+        # Представления без запроса, например при генерации OpenAPI-схемы
+        return None
+    if not hasattr(request, '_cached_user'):
+        user = None
+        if getattr(request, 'email', None):
+            try:
+                user = CustomUser.objects.get(email=request.email, is_active=True)
+            except CustomUser.DoesNotExist:
+                pass
+        request._cached_user = user
+    return request._cached_user
+
+
+def get_request_user_id(request):
+    """
+    Id пользователя запроса. Берется из актуальных claims токена,
+    иначе из пользователя, загруженного из БД
+    """
+    request = getattr(request, '_request', request)
+    if request is None:
+        return None
+    if not hasattr(request, '_cached_user_id'):
+        user = get_request_user(request)
+        request._cached_user_id = user.id if user is not None else None
+    return request._cached_user_id
+
+
+def get_request_role_ids(request):
+    """Идентификаторы ролей пользователя запроса, кешируются на запросе"""
+    request = getattr(request, '_request', request)
+    if request is None:
+        return []
+    if not hasattr(request, '_cached_role_ids'):
+        user = get_request_user(request)
+        request._cached_role_ids = get_role_ids(user) if user is not None else []
+    return request._cached_role_ids
+
+
+def get_known_role_ids(request):
+    """
+    Роли пользователя запроса, если они известны без обращения к БД
+    (из claims токена или уже загружены в этом запросе), иначе None
+    """
+    request = getattr(request, '_request', request)
+    return getattr(request, '_cached_role_ids', None)
+
+
+async def aget_request_user(request):
+    """Асинхронный вариант get_request_user, кеш на запросе общий с синхронным"""
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_cached_user'):
+        user = None
+        if getattr(request, 'email', None):
+            try:
+                user = await CustomUser.objects.aget(email=request.email, is_active=True)
+            except CustomUser.DoesNotExist:
+                pass
+        request._cached_user = user
+    return request._cached_user
+
+
+async def aget_request_user_id(request):
+    """Асинхронный вариант get_request_user_id"""
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_cached_user_id'):
+        user = await aget_request_user(request)
+        request._cached_user_id = user.id if user is not None else None
+    return request._cached_user_id
+
+
+async def aget_request_role_ids(request):
+    """Асинхронный вариант get_request_role_ids"""
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_cached_role_ids'):
+        user = await aget_request_user(request)
+        request._cached_role_ids = await aget_role_ids(user) if user is not None else []
+    return request._cached_role_ids
 
 
 class AuthenticationMiddleware:
+    """
+    Разбирает JWT из заголовка Authorization.
+    Поддерживает и WSGI, и ASGI: под ASGI цепочка остается асинхронной
+    и не переключается в поток ради каждого запроса.
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        generation = sync_permission_matrix()
+        self.authenticate(request, generation)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Счетчик поколений может жить в кеше на БД - синхронный вызов уходит в поток
+        generation = await sync_to_async(sync_permission_matrix)()
+        self.authenticate(request, generation)
+        return await self.get_response(request)
+
+    def authenticate(self, request, generation):
+        """Проверяет токен без обращений к БД и заполняет request.email"""
         auth_header = request.headers.get('Authorization')
         if auth_header and auth_header.startswith('Bearer '):
             try:
                 token = auth_header[7:]
-                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+                payload = decode_token(token)
                 email = payload['email']
                 request.email = email
-            except (jwt.ExpiredSignatureError, jwt.DecodeError, CustomUser.DoesNotExist):
+                self.apply_authorization_claims(request, payload, generation)
+            except jwt.ExpiredSignatureError:
+                JWT_DECODE_FAILURES.inc(reason='expired')
+                request.email = None
+            except (jwt.DecodeError, CustomUser.DoesNotExist):
+                JWT_DECODE_FAILURES.inc(reason='invalid')
                 request.email = None
         else:
             request.email = None
-        response = self.get_response(request)
-        return response
+
+    @staticmethod
+    def apply_authorization_claims(request, payload, generation):
+        """
+        Если токен выдан в текущем поколении RBAC, id пользователя и его роли
+        берутся прямо из claims. Иначе они будут загружены из БД при первом обращении.
+        """
+        if payload.get('rbac_gen') != generation:
+            return
+        try:
+            request._cached_user_id = payload['user_id']
+            request._cached_role_ids = list(payload['role_ids'])
+        except (KeyError, TypeError):
+            request.__dict__.pop('_cached_user_id', None)
+            request.__dict__.pop('_cached_role_ids', None)
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+INDEX_NAME = 'accessrule_element_role_cov_idx'
+
+PERMISSION_COLUMNS = (
+    'create_permission',
+    'read_own_permission',
+    'read_all_permission',
+    'update_own_permission',
+    'update_all_permission',
+    'delete_own_permission',
+    'delete_all_permission',
+)
+
+
+def create_covering_index(apps, schema_editor):
+    # INCLUDE поддерживается только PostgreSQL, на остальных СУБД хватает unique (role, element)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        f'ON custom_auth_accessrule (element_id, role_id) INCLUDE ({", ".join(PERMISSION_COLUMNS)})'
+    )
+
+
+def drop_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0004_remove_customuser_username_customuser_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _readable_fields(serializer):
+    return [field for field in serializer.fields.values() if not field.write_only]
+
+
+@lru_cache(maxsize=None)
+def related_loading_plan(serializer_class):
+    """
+    Вычисляет по объявленным полям сериализатора, какие связи подгружать:
+    (select_related, prefetch_related, only).
+
+    Вложенный сериализатор на ForeignKey/OneToOne попадает в select_related,
+    на ManyToMany - в prefetch_related. В only попадают только поля, которые
+    сериализатор реально выводит, включая поля вложенных объектов.
+    """
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    select_related, prefetch_related, only = [], [], []
+
+    for field in _readable_fields(serializer):
+        model_field = _model_field(model, field.source)
+        if model_field is None:
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if model_field.many_to_many or model_field.one_to_many:
+            if isinstance(nested, serializers.BaseSerializer):
+                prefetch_related.append(field.source)
+            continue
+
+        only.append(field.source)
+        if not isinstance(nested, serializers.ModelSerializer):
+            continue
+        if not (model_field.many_to_one or model_field.one_to_one):
+            continue
+
+        select_related.append(field.source)
+        related_model = model_field.related_model
+        only.append(f'{field.source}__{related_model._meta.pk.name}')
+        for related_field in _readable_fields(nested):
+            concrete = _model_field(related_model, related_field.source)
+            if concrete is not None and concrete.concrete and not concrete.is_relation:
+                only.append(f'{field.source}__{related_field.source}')
+
+    return tuple(select_related), tuple(prefetch_related), tuple(dict.fromkeys(only))
+
+
+class RelatedLoadingMixin:
+    """
+    Подгружает связанные объекты, которые выводит сериализатор вьюсета,
+    в том же запросе (select_related/only), чтобы список из N объектов
+    не порождал N дополнительных запросов за вложенными данными.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        select_related, prefetch_related, only = related_loading_plan(self.get_serializer_class())
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if only:
+            queryset = queryset.only(*only)
+        return queryset
@@ -26,20 +26,46 @@ class CustomUser(models.Model):
 
     roles = models.ManyToManyField(Role, related_name='users')
 
+    @staticmethod
+    def hash_password(raw_password):
+        """Возвращает bcrypt-хеш пароля со стоимостью BCRYPT_ROUNDS"""
+        salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+        return bcrypt.hashpw(raw_password.encode('utf-8'), salt).decode('utf-8')
+
     def set_password(self, raw_password):
         """Хеширует пароль с помощью bcrypt"""
-        self.password_hash = bcrypt.hashpw(raw_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = self.hash_password(raw_password)
 
     def check_password(self, raw_password):
         """Проверяет пароль"""
         return bcrypt.checkpw(raw_password.encode('utf-8'), self.password_hash.encode('utf-8'))
 
+    def password_needs_rehash(self):
+        """Стоимость сохраненного хеша ($2b$<rounds>$...) отличается от BCRYPT_ROUNDS"""
+        try:
+            rounds = int(self.password_hash.split('$')[2])
+        except (IndexError, ValueError):
+            return True
+        return rounds != settings.BCRYPT_ROUNDS
+
     def generate_jwt_token(self):
-        """Генерирует JWT токен для пользователя"""
+        """
+        Генерирует JWT токен для пользователя.
+        При JWT_EMBED_AUTHORIZATION_CLAIMS в токен добавляются id пользователя,
+        id его ролей и поколение RBAC на момент выдачи - middleware авторизует
+        по ним без обращения к БД, пока поколение не изменится.
+        """
         payload = {
             'email': self.email,
             'exp': datetime.now() + timedelta(hours=settings.JWT_TOKEN_LIFETIME_HOURS)
         }
+        if settings.JWT_EMBED_AUTHORIZATION_CLAIMS:
+            from .permissions import get_rbac_generation, get_role_ids
+
+            # Поколение читается до ролей: изменение между чтениями сделает токен устаревшим
+            payload['rbac_gen'] = get_rbac_generation()
+            payload['user_id'] = self.id
+            payload['role_ids'] = get_role_ids(self)
         return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
 
     def __str__(self):
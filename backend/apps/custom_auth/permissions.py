@@ -0,0 +1,212 @@
+"""
+Скомпилированная матрица прав доступа.
+
+Все строки AccessRule собираются в словарь (role_id, element_name) -> битовая маска,
+где каждый CRUD-флаг - отдельный бит. Проверка прав сводится к поиску в словаре
+и побитовому ИЛИ по ролям пользователя без обращений к базе данных.
+
+Актуальность матрицы между процессами (воркерами gunicorn) обеспечивается
+счетчиком поколений RBAC в общем кеше: любое изменение правил увеличивает счетчик,
+и каждый процесс пересобирает свою матрицу, увидев новое поколение.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Exists, Q
+
+from apps.monitoring.metrics import CACHE_REQUESTS
+from config.db_router import use_primary
+
+from .models import AccessRule, CustomUser
+
+RBAC_GENERATION_CACHE_KEY = 'rbac:generation'
+
+PERMISSION_FLAGS = (
+    'create_permission',
+    'read_own_permission',
+    'read_all_permission',
+    'update_own_permission',
+    'update_all_permission',
+    'delete_own_permission',
+    'delete_all_permission',
+)
+
+PERMISSION_BITS = {flag: 1 << index for index, flag in enumerate(PERMISSION_FLAGS)}
+
+# Действия, для которых есть пара прав *_all_permission/*_own_permission
+OWNERSHIP_ACTIONS = ('read', 'update', 'delete')
+
+
+class PermissionMatrix:
+    """Таблица битовых масок прав: одно число на пару роль/бизнес-элемент"""
+
+    def __init__(self, masks, generation=None):
+        self._masks = masks
+        self.generation = generation
+
+    @classmethod
+    def compile(cls, generation=None):
+        """Собирает матрицу одним запросом по всем правилам доступа"""
+        masks = {}
+        # Из основной БД: поколение уже новое, а реплика может еще не получить изменения правил
+        with use_primary():
+            rows = list(AccessRule.objects.values_list('role_id', 'element__name', *PERMISSION_FLAGS))
+        for role_id, element_name, *flags in rows:
+            mask = 0
+            for flag, enabled in zip(PERMISSION_FLAGS, flags):
+                if enabled:
+                    mask |= PERMISSION_BITS[flag]
+            if mask:
+                masks[(role_id, element_name)] = mask
+        return cls(masks, generation)
+
+    def mask_for(self, role_ids, element_name):
+        """Объединенная маска прав всех ролей на бизнес-элемент"""
+        mask = 0
+        for role_id in role_ids:
+            mask |= self._masks.get((role_id, element_name), 0)
+        return mask
+
+    def has_permission(self, role_ids, element_name, permission_type):
+        return bool(self.mask_for(role_ids, element_name) & PERMISSION_BITS[permission_type])
+
+    def __len__(self):
+        return len(self._masks)
+
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def _rbac_cache():
+    return caches[settings.RBAC_CACHE_ALIAS]
+
+
+def get_rbac_generation():
+    """Текущее поколение RBAC из общего кеша"""
+    cache = _rbac_cache()
+    generation = cache.get(RBAC_GENERATION_CACHE_KEY)
+    if generation is None:
+        # Начальное значение от времени, чтобы после вытеснения ключа из кеша
+        # поколение не совпало с одним из уже виденных процессами
+        cache.add(RBAC_GENERATION_CACHE_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(RBAC_GENERATION_CACHE_KEY)
+    return generation
+
+
+def bump_rbac_generation():
+    """Увеличивает поколение RBAC - все процессы пересоберут матрицу прав"""
+    cache = _rbac_cache()
+    try:
+        return cache.incr(RBAC_GENERATION_CACHE_KEY)
+    except ValueError:
+        cache.add(RBAC_GENERATION_CACHE_KEY, time.time_ns(), timeout=None)
+        return cache.get(RBAC_GENERATION_CACHE_KEY)
+
+
+def get_permission_matrix():
+    """Возвращает матрицу текущего процесса, компилируя ее при первом обращении"""
+    global _matrix
+    matrix = _matrix
+    if matrix is None:
+        with _lock:
+            if _matrix is None:
+                # Поколение читается до компиляции: изменение, пришедшее во время
+                # сборки, будет замечено при следующей синхронизации
+                _matrix = PermissionMatrix.compile(get_rbac_generation())
+            matrix = _matrix
+    return matrix
+
+
+def sync_permission_matrix():
+    """
+    Сверяет поколение матрицы процесса с общим счетчиком.
+    Вызывается один раз на запрос; при расхождении матрица сбрасывается.
+    Возвращает текущее поколение.
+    """
+    global _matrix
+    generation = get_rbac_generation()
+    matrix = _matrix
+    if matrix is not None and matrix.generation != generation:
+        with _lock:
+            if _matrix is matrix:
+                _matrix = None
+    CACHE_REQUESTS.inc(cache='rbac_matrix', result='hit' if _matrix is not None else 'miss')
+    return generation
+
+
+def invalidate_permission_matrix():
+    """Сбрасывает матрицу процесса - она будет пересобрана при следующей проверке"""
+    global _matrix
+    with _lock:
+        _matrix = None
+
+
+def has_permission(role_ids, element_name, permission_type):
+    """Проверяет, дает ли хотя бы одна из ролей указанное право на бизнес-элемент"""
+    return get_permission_matrix().has_permission(role_ids, element_name, permission_type)
+
+
+async def aget_permission_matrix():
+    """Асинхронный вариант get_permission_matrix: в поток уходит только компиляция"""
+    matrix = _matrix
+    if matrix is None:
+        matrix = await sync_to_async(get_permission_matrix)()
+    return matrix
+
+
+async def ahas_permission(role_ids, element_name, permission_type):
+    """Асинхронная проверка прав без обращений к БД после первой компиляции матрицы"""
+    return (await aget_permission_matrix()).has_permission(role_ids, element_name, permission_type)
+
+
+def get_role_ids(user):
+    """Идентификаторы ролей пользователя"""
+    return list(user.roles.values_list('id', flat=True))
+
+
+async def aget_role_ids(user):
+    """Идентификаторы ролей пользователя (асинхронный ORM)"""
+    return [pk async for pk in user.roles.values_list('id', flat=True)]
+
+
+def filter_permitted(queryset, user_id, element_name, action, ownership_field, role_ids=None):
+    """
+    Объекты queryset, над которыми пользователь может выполнить action ('read', 'update',
+    'delete'): все при праве *_all_permission, свои (по ownership_field) при *_own_permission.
+    Свои объекты пользователь видит ('read') всегда, даже без read_own_permission -
+    без read_all_permission списки всегда отдавали записи владельца.
+
+    Если роли пользователя уже известны (role_ids, например из claims токена), решение
+    принимается по матрице прав, и в SQL остается только условие по владельцу.
+    Иначе правила проверяются в том же запросе подзапросами EXISTS по AccessRule
+    и ролям пользователя - отдельные запросы за ролями не нужны.
+    """
+    if action not in OWNERSHIP_ACTIONS:
+        raise ValueError(f'Неизвестное действие {action!r}, ожидается одно из {OWNERSHIP_ACTIONS}')
+    if user_id is None:
+        return queryset.none()
+
+    all_permission, own_permission = f'{action}_all_permission', f'{action}_own_permission'
+    owned = Q(**{queryset.model._meta.get_field(ownership_field).attname: user_id})
+
+    owned_always = action == 'read'
+
+    if role_ids is not None:
+        if has_permission(role_ids, element_name, all_permission):
+            return queryset.all()
+        if owned_always or has_permission(role_ids, element_name, own_permission):
+            return queryset.filter(owned)
+        return queryset.none()
+
+    user_roles = CustomUser.roles.through.objects.filter(customuser_id=user_id).values('role_id')
+    rules = AccessRule.objects.filter(element__name=element_name, role_id__in=user_roles)
+    if owned_always:
+        return queryset.filter(owned | Exists(rules.filter(**{all_permission: True})))
+    return queryset.filter(
+        Exists(rules.filter(**{all_permission: True}))
+        | (owned & Exists(rules.filter(**{own_permission: True})))
+    )
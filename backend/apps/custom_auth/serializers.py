@@ -80,8 +80,13 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
+        # Хеш может быть вычислен заранее вне потока запроса (см. RegisterView)
+        password_hash = validated_data.pop('password_hash', None)
         user = CustomUser(**validated_data)
-        user.set_password(password)
+        if password_hash:
+            user.password_hash = password_hash
+        else:
+            user.set_password(password)
         user.save()
         return user
 
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import AccessRule, BusinessElement, CustomUser, Role
+from .permissions import bump_rbac_generation, invalidate_permission_matrix
+
+
+def _rbac_changed():
+    # Свой процесс сбрасывает матрицу сразу, остальные - после коммита,
+    # когда новые данные уже видны в их соединениях
+    invalidate_permission_matrix()
+    transaction.on_commit(bump_rbac_generation)
+
+
+@receiver(post_save, sender=AccessRule)
+@receiver(post_delete, sender=AccessRule)
+@receiver(post_save, sender=BusinessElement)
+@receiver(post_delete, sender=BusinessElement)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def rbac_changed(sender, **kwargs):
+    """Любое изменение правил, ролей или бизнес-элементов меняет поколение RBAC"""
+    _rbac_changed()
+
+
+@receiver(m2m_changed, sender=CustomUser.roles.through)
+def user_roles_changed(sender, action, **kwargs):
+    """Назначение и снятие ролей пользователя меняет поколение RBAC"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _rbac_changed()
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_access_revoked(sender, instance, signal, **kwargs):
+    """
+    Деактивация или удаление пользователя делает устаревшими claims в его токенах -
+    новое поколение RBAC заставит middleware проверить пользователя по БД
+    """
+    if signal is post_delete or not instance.is_active:
+        transaction.on_commit(bump_rbac_generation)
@@ -1,5 +1,4 @@
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from config.api_docs import openapi, swagger_auto_schema
 from .serializers import (
     UserRegistrationSerializer,
     LoginSerializer,
@@ -277,14 +276,18 @@ role_list_schema = swagger_auto_schema(
             description="Список ролей",
             schema=RoleSerializer(many=True),
             examples={
-                "application/json": [
-                    {
-                        "id": 1,
-                        "name": "admin",
-                        "description": "Администратор системы",
-                        "created_at": "2025-10-04T20:00:00Z"
-                    }
-                ]
+                "application/json": {
+                    "next": "http://localhost:8000/api/auth/roles/?cursor=cD0yMDI1LTEwLTA0VDEyJTNBMDAlM0EwMFo%3D",
+                    "previous": None,
+                    "results": [
+                        {
+                            "id": 1,
+                            "name": "admin",
+                            "description": "Администратор системы",
+                            "created_at": "2025-10-04T20:00:00Z"
+                        }
+                    ]
+                }
             }
         ),
         401: unauthorized_response,
@@ -358,29 +361,33 @@ access_rule_list_schema = swagger_auto_schema(
             description="Список правил доступа",
             schema=AccessRuleSerializer(many=True),
             examples={
-                "application/json": [
-                    {
-                        "id": 1,
-                        "role": {
-                            "id": 1,
-                            "name": "admin",
-                            "description": "Администратор системы"
-                        },
-                        "element": {
+                "application/json": {
+                    "next": "http://localhost:8000/api/auth/access-rules/?cursor=cD0yMDI1LTEwLTA0VDEyJTNBMDAlM0EwMFo%3D",
+                    "previous": None,
+                    "results": [
+                        {
                             "id": 1,
-                            "name": "projects",
-                            "description": "Проекты"
-                        },
-                        "create_permission": True,
-                        "read_own_permission": True,
-                        "read_all_permission": True,
-                        "update_own_permission": True,
-                        "update_all_permission": True,
-                        "delete_permission": True,
-                        "delete_all_permission": True,
-                        "created_at": "2025-10-04T20:00:00Z"
-                    }
-                ]
+                            "role": {
+                                "id": 1,
+                                "name": "admin",
+                                "description": "Администратор системы"
+                            },
+                            "element": {
+                                "id": 1,
+                                "name": "projects",
+                                "description": "Проекты"
+                            },
+                            "create_permission": True,
+                            "read_own_permission": True,
+                            "read_all_permission": True,
+                            "update_own_permission": True,
+                            "update_all_permission": True,
+                            "delete_permission": True,
+                            "delete_all_permission": True,
+                            "created_at": "2025-10-04T20:00:00Z"
+                        }
+                    ]
+                }
             }
         ),
         401: unauthorized_response,
@@ -0,0 +1,24 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """Проверки числа SQL-запросов для тестов API"""
+
+    def assertListQueriesConstant(self, url, add_rows, batches=(1, 5)):
+        """
+        Число запросов к эндпоинту-списку не зависит от числа строк.
+        add_rows(n) добавляет n строк, видимых текущему клиенту, перед каждым замером.
+        Возвращает число запросов.
+        """
+        # Прогрев: однократные расходы процесса (например, сборка матрицы прав) не в счет
+        self.client.get(url)
+        counts = []
+        for rows in batches:
+            add_rows(rows)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(len(set(counts)), 1, f'Число запросов растет вместе с числом строк: {counts}')
+        return counts[0]
@@ -1,10 +1,25 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
+
+import jwt
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from apps.custom_auth.models import CustomUser, Role, BusinessElement, AccessRule
+from apps.custom_auth.permissions import get_permission_matrix, has_permission, get_rbac_generation, \
+    bump_rbac_generation, sync_permission_matrix
+from apps.custom_auth.hashing import HashingPool
+from apps.custom_auth.middleware import AuthenticationMiddleware, aget_request_role_ids, aget_request_user_id
+from apps.custom_auth.testing import QueryCountAssertionsMixin
+from apps.custom_auth.token_cache import TokenCache, decode_token, get_token_cache
 
 
-class AuthEndpointsTestCase(TestCase):
+class AuthEndpointsTestCase(QueryCountAssertionsMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
         self.setup_roles_and_permissions()
@@ -157,6 +172,20 @@ class AuthEndpointsTestCase(TestCase):
         response = self.client.get('/api/auth/access-rules/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_access_rules_list_queries_do_not_grow_with_rows(self):
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        def add_rules(count):
+            elements = BusinessElement.objects.bulk_create(
+                BusinessElement(name=f'element{BusinessElement.objects.count() + index}') for index in range(count)
+            )
+            AccessRule.objects.bulk_create(
+                AccessRule(role=self.user_role, element=element, read_own_permission=True) for element in elements
+            )
+
+        self.assertEqual(self.assertListQueriesConstant('/api/auth/access-rules/', add_rules), 1)
+
     def test_access_rules_create_admin(self):
         token = self.get_token('admin@test.com', 'admin123')
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
@@ -188,3 +217,294 @@ class AuthEndpointsTestCase(TestCase):
         data = {'name': 'newelement', 'description': 'New Element'}
         response = self.client.post('/api/auth/business-elements/', data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_profile_conditional_get(self):
+        token = self.get_token('admin@test.com', 'admin123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/auth/profile/')
+        etag = response['ETag']
+        self.assertIn('Authorization', response['Vary'])
+
+        response = self.client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.admin_user.first_name = 'Renamed'
+        self.admin_user.save()
+        response = self.client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['first_name'], 'Renamed')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_roles_conditional_get_follows_rbac_generation(self):
+        token = self.get_token('manager@test.com', 'manager123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        etag = self.client.get('/api/auth/roles/')['ETag']
+        self.assertNotEqual(self.client.get(f'/api/auth/roles/{self.admin_role.id}/')['ETag'], etag)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/roles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Role.objects.create(name='auditor', description='Auditor')
+        response = self.client.get('/api/auth/roles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('auditor', [role['name'] for role in response.data['results']])
+
+    def test_roles_conditional_get_checks_permission_first(self):
+        token = self.get_token('manager@test.com', 'manager123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        etag = self.client.get('/api/auth/roles/')['ETag']
+
+        token = self.get_token('user@test.com', 'user123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/auth/roles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PermissionMatrixTestCase(TestCase):
+    def setUp(self):
+        self.admin_role = Role.objects.create(name='admin')
+        self.user_role = Role.objects.create(name='user')
+        self.projects_element = BusinessElement.objects.create(name='projects')
+
+        AccessRule.objects.create(
+            role=self.admin_role, element=self.projects_element,
+            read_all_permission=True, update_all_permission=True
+        )
+        self.user_rule = AccessRule.objects.create(
+            role=self.user_role, element=self.projects_element,
+            read_own_permission=True, create_permission=True
+        )
+
+    def test_masks_are_combined_across_roles(self):
+        role_ids = [self.admin_role.id, self.user_role.id]
+        matrix = get_permission_matrix()
+        self.assertTrue(matrix.has_permission(role_ids, 'projects', 'read_all_permission'))
+        self.assertTrue(matrix.has_permission(role_ids, 'projects', 'create_permission'))
+        self.assertFalse(matrix.has_permission(role_ids, 'projects', 'delete_all_permission'))
+        self.assertFalse(matrix.has_permission([self.user_role.id], 'projects', 'read_all_permission'))
+        self.assertFalse(matrix.has_permission(role_ids, 'tasks', 'read_all_permission'))
+
+    def test_compiled_check_does_not_query(self):
+        get_permission_matrix()
+        with self.assertNumQueries(0):
+            has_permission([self.user_role.id], 'projects', 'read_own_permission')
+
+    def test_rule_change_invalidates_matrix(self):
+        self.assertFalse(has_permission([self.user_role.id], 'projects', 'delete_own_permission'))
+        self.user_rule.delete_own_permission = True
+        self.user_rule.save()
+        self.assertTrue(has_permission([self.user_role.id], 'projects', 'delete_own_permission'))
+
+
+class RBACGenerationTestCase(TestCase):
+    def setUp(self):
+        self.role = Role.objects.create(name='user')
+        self.element = BusinessElement.objects.create(name='projects')
+        self.rule = AccessRule.objects.create(role=self.role, element=self.element, read_own_permission=True)
+
+    def test_rule_change_bumps_generation_on_commit(self):
+        generation = get_rbac_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule.read_all_permission = True
+            self.rule.save()
+        self.assertGreater(get_rbac_generation(), generation)
+
+    def test_role_assignment_bumps_generation_on_commit(self):
+        user = CustomUser.objects.create(email='user@test.com', first_name='User')
+        generation = get_rbac_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.roles.add(self.role)
+        self.assertGreater(get_rbac_generation(), generation)
+
+    def test_stale_matrix_is_rebuilt_after_foreign_bump(self):
+        matrix = get_permission_matrix()
+        sync_permission_matrix()
+        self.assertIs(get_permission_matrix(), matrix)
+
+        # Изменение из другого воркера: данные в БД и поколение в общем кеше
+        AccessRule.objects.filter(pk=self.rule.pk).update(delete_own_permission=True)
+        self.assertFalse(has_permission([self.role.id], 'projects', 'delete_own_permission'))
+        bump_rbac_generation()
+
+        sync_permission_matrix()
+        self.assertTrue(has_permission([self.role.id], 'projects', 'delete_own_permission'))
+
+
+class TokenClaimsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.role = Role.objects.create(name='admin')
+        self.element = BusinessElement.objects.create(name='roles')
+        AccessRule.objects.create(role=self.role, element=self.element, read_all_permission=True)
+        self.user = CustomUser.objects.create(email='admin@test.com', first_name='Admin')
+        self.user.roles.add(self.role)
+
+    def user_lookups(self, queries):
+        return [q for q in queries.captured_queries if '"custom_auth_customuser"."email" =' in q['sql']]
+
+    def test_token_carries_authorization_claims(self):
+        payload = jwt.decode(self.user.generate_jwt_token(), settings.SECRET_KEY, algorithms=['HS256'])
+        self.assertEqual(payload['user_id'], self.user.id)
+        self.assertEqual(payload['role_ids'], [self.role.id])
+        self.assertEqual(payload['rbac_gen'], get_rbac_generation())
+
+    def test_current_generation_token_skips_user_lookup(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.user.generate_jwt_token()}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/roles/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user_lookups(queries), [])
+
+    def test_stale_generation_token_falls_back_to_database(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.user.generate_jwt_token()}')
+        bump_rbac_generation()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/roles/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.user_lookups(queries)), 1)
+
+    def test_deactivated_user_claims_are_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.user.generate_jwt_token()}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response = self.client.get('/api/auth/roles/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_middleware_runs_natively_async(self):
+        async def get_response(request):
+            return request
+
+        middleware = AuthenticationMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        request = RequestFactory().get('/', headers={'Authorization': f'Bearer {self.user.generate_jwt_token()}'})
+        request = async_to_sync(middleware)(request)
+        self.assertEqual(request.email, self.user.email)
+        self.assertEqual(async_to_sync(aget_request_user_id)(request), self.user.id)
+        self.assertEqual(async_to_sync(aget_request_role_ids)(request), [self.role.id])
+
+    def test_async_helpers_load_user_from_database_for_stale_token(self):
+        request = RequestFactory().get('/')
+        request.email = self.user.email
+        self.assertEqual(async_to_sync(aget_request_user_id)(request), self.user.id)
+        self.assertEqual(async_to_sync(aget_request_role_ids)(request), [self.role.id])
+
+
+class TokenCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = TokenCache(maxsize=2, ttl=60)
+
+    def test_hits_and_misses_are_counted(self):
+        self.assertIsNone(self.cache.get('token-a', now=0))
+        self.cache.set('token-a', {'email': 'a@test.com', 'exp': 1000}, now=0)
+        self.assertEqual(self.cache.get('token-a', now=1), {'email': 'a@test.com', 'exp': 1000})
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_token_expiry_is_honored(self):
+        self.cache.set('token-a', {'email': 'a@test.com', 'exp': 30}, now=0)
+        self.assertIsNotNone(self.cache.get('token-a', now=29.9))
+        self.assertIsNone(self.cache.get('token-a', now=30))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_ttl_bounds_entry_lifetime(self):
+        self.cache.set('token-a', {'email': 'a@test.com', 'exp': 1000}, now=0)
+        self.assertIsNone(self.cache.get('token-a', now=60))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('token-a', {'email': 'a@test.com'}, now=0)
+        self.cache.set('token-b', {'email': 'b@test.com'}, now=0)
+        self.cache.get('token-a', now=1)
+        self.cache.set('token-c', {'email': 'c@test.com'}, now=1)
+        self.assertIsNotNone(self.cache.get('token-a', now=2))
+        self.assertIsNone(self.cache.get('token-b', now=2))
+
+    def test_expired_token_is_rejected_by_middleware(self):
+        CustomUser.objects.create(email='a@test.com', first_name='A')
+        get_token_cache().clear()
+        token = jwt.encode({'email': 'a@test.com', 'exp': time.time() - 1}, settings.SECRET_KEY, algorithm='HS256')
+        response = self.client.get('/api/auth/profile/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(get_token_cache()), 0)
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            decode_token(token)
+        self.assertEqual(len(get_token_cache()), 0)
+
+
+class HashingPoolTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create(email='user@test.com', first_name='User')
+        self.user.set_password('user123')
+        self.user.save()
+
+    def test_slots_are_released_after_completion(self):
+        pool = HashingPool(max_workers=1, max_pending=0)
+        self.assertEqual(pool.run(CustomUser.hash_password, 'secret')[:4], '$2b$')
+        self.assertTrue(pool.run(self.user.check_password, 'user123'))
+
+    def test_saturated_pool_rejects_login_and_register(self):
+        pool = HashingPool(max_workers=1, max_pending=0)
+        release = threading.Event()
+        pool.submit(release.wait)
+        try:
+            with mock.patch('apps.custom_auth.views.get_hashing_pool', return_value=pool):
+                login = self.client.post('/api/auth/login/', {'email': 'user@test.com', 'password': 'user123'})
+                register = self.client.post('/api/auth/register/', {
+                    'email': 'new@test.com', 'first_name': 'New',
+                    'password': 'newpass123', 'password_confirm': 'newpass123'
+                })
+        finally:
+            release.set()
+        self.assertEqual(login.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(register.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(CustomUser.objects.filter(email='new@test.com').exists())
+
+    def test_full_queue_rejects_login_without_waiting(self):
+        pool = HashingPool(settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE_SIZE)
+        release = threading.Event()
+        # Медленный хеш занимает все потоки пула и все места в очереди
+        for _ in range(settings.PASSWORD_HASHING_WORKERS + settings.PASSWORD_HASHING_QUEUE_SIZE):
+            pool.submit(release.wait)
+        try:
+            with mock.patch('apps.custom_auth.views.get_hashing_pool', return_value=pool):
+                started = time.monotonic()
+                response = self.client.post('/api/auth/login/', {'email': 'user@test.com', 'password': 'user123'})
+                elapsed = time.monotonic() - started
+        finally:
+            release.set()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        # Поток запроса не ждет освобождения пула
+        self.assertLess(elapsed, 1)
+
+
+class PasswordRehashTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        with override_settings(BCRYPT_ROUNDS=settings.BCRYPT_ROUNDS + 1):
+            self.user = CustomUser.objects.create(email='user@test.com', first_name='User')
+            self.user.set_password('user123')
+            self.user.save()
+
+    def test_hash_cost_follows_setting(self):
+        self.assertTrue(self.user.password_needs_rehash())
+        with override_settings(BCRYPT_ROUNDS=settings.BCRYPT_ROUNDS + 1):
+            self.assertFalse(self.user.password_needs_rehash())
+
+    def test_login_rehashes_to_configured_cost(self):
+        response = self.client.post('/api/auth/login/', {'email': 'user@test.com', 'password': 'user123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.password_needs_rehash())
+        self.assertTrue(self.user.check_password('user123'))
+
+    def test_failed_login_keeps_hash(self):
+        old_hash = self.user.password_hash
+        response = self.client.post('/api/auth/login/', {'email': 'user@test.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password_hash, old_hash)
@@ -0,0 +1,107 @@
+"""
+Кеш декодированных JWT.
+
+Клиент повторно использует один и тот же токен в течение всего срока его жизни,
+поэтому проверенный payload сохраняется в ограниченном LRU-кеше процесса
+и повторная проверка подписи и разбор JSON не выполняются.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+
+from apps.monitoring.metrics import CACHE_REQUESTS
+
+
+class TokenCache:
+    """LRU-кеш проверенных payload токенов с ограничением по размеру и времени жизни"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(token):
+        # Сам токен в памяти не хранится - только его хеш
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token, now=None):
+        """Payload из кеша или None, если токена нет или срок записи истек"""
+        now = time.time() if now is None else now
+        key = self.make_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def set(self, token, payload, now=None):
+        """
+        Сохраняет проверенный payload. Запись живет не дольше ttl
+        и не дольше exp самого токена
+        """
+        if self.maxsize <= 0:
+            return
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+        key = self.make_key(token)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    """Кеш токенов текущего процесса"""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache(settings.JWT_DECODE_CACHE_SIZE, settings.JWT_DECODE_CACHE_TTL)
+    return _token_cache
+
+
+def decode_token(token):
+    """
+    Проверяет и декодирует JWT, используя кеш.
+    Ошибки проверки (истекший срок, неверная подпись) пробрасываются как из jwt.decode
+    """
+    cache = get_token_cache()
+    payload = cache.get(token)
+    if payload is None:
+        CACHE_REQUESTS.inc(cache='jwt_decode', result='miss')
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+        cache.set(token, payload)
+    else:
+        CACHE_REQUESTS.inc(cache='jwt_decode', result='hit')
+    return payload
@@ -1,13 +1,17 @@
 from django.core.serializers import serialize
 from django.utils.decorators import method_decorator
-from drf_yasg import openapi
-from drf_yasg.utils import swagger_auto_schema
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, viewsets
+from apps.monitoring.metrics import PASSWORD_HASHING_SECONDS
 
+from .conditional import RbacETagMixin, conditional_response, make_etag
 from .decorators import require_authentication, require_permission
+from .hashing import HashingPoolSaturated, get_hashing_pool
 from .models import CustomUser, AccessRule, Role, BusinessElement
+from .mixins import RelatedLoadingMixin
+from .middleware import get_request_role_ids, get_request_user, get_request_user_id
+from .permissions import has_permission
 from .serializers import UserRegistrationSerializer, LoginSerializer, UserSerializer, RoleSerializer, \
     AccessRuleSerializer, BusinessElementSerializer
 from .swagger_schemas import register_schema, login_schema, logout_schema, profile_schema, \
@@ -17,12 +21,27 @@ from .swagger_schemas import register_schema, login_schema, logout_schema, profi
     business_element_destroy_schema, business_element_update_schema, delete_account_schema
 
 
+def hashing_pool_saturated_response():
+    return Response(
+        {'error': 'Сервис перегружен', 'message': 'Слишком много одновременных входов, повторите попытку позже'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': '1'},
+    )
+
+
 class RegisterView(APIView):
     @register_schema
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
+            try:
+                with PASSWORD_HASHING_SECONDS.time(operation='register'):
+                    password_hash = get_hashing_pool().run(
+                        CustomUser.hash_password, serializer.validated_data['password']
+                    )
+            except HashingPoolSaturated:
+                return hashing_pool_saturated_response()
+            user = serializer.save(password_hash=password_hash)
             token = user.generate_jwt_token()
             return Response({
                 'user': UserSerializer(user).data,
@@ -42,7 +61,20 @@ class LoginView(APIView):
 
             try:
                 user = CustomUser.objects.get(email=email, is_active=True)
-                if user.check_password(password):
+                try:
+                    with PASSWORD_HASHING_SECONDS.time(operation='login'):
+                        password_valid = get_hashing_pool().run(user.check_password, password)
+                except HashingPoolSaturated:
+                    return hashing_pool_saturated_response()
+                if password_valid:
+                    if user.password_needs_rehash():
+                        # Переводим хеш на текущую стоимость bcrypt, пока известен пароль
+                        try:
+                            with PASSWORD_HASHING_SECONDS.time(operation='rehash'):
+                                user.password_hash = get_hashing_pool().run(CustomUser.hash_password, password)
+                            user.save(update_fields=['password_hash'])
+                        except HashingPoolSaturated:
+                            pass
                     token = user.generate_jwt_token()
                     return Response({
                         'user': UserSerializer(user).data,
@@ -74,14 +106,15 @@ class ProfileView(APIView):
     def get(self, request):
         if not hasattr(request, 'email') or  request.email is None:
             return Response({'error': 'Требуется авторизация'}, status=status.HTTP_401_UNAUTHORIZED)
-        try:
-            user = CustomUser.objects.get(email=request.email, is_active=True)
-        except CustomUser.DoesNotExist:
+        user = get_request_user(request)
+        if user is None:
             return Response({'error': 'Требуется авторизация'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        return Response({
+        # Поля профиля берутся из уже загруженного пользователя, сериализатор для 304 не нужен
+        etag = make_etag(*(getattr(user, name) for name in UserSerializer.Meta.fields))
+        return conditional_response(request, etag, lambda: Response({
             'user': UserSerializer(user).data
-        })
+        }))
 
 
 class DeleteAccountView(APIView):
@@ -90,35 +123,29 @@ class DeleteAccountView(APIView):
         if not hasattr(request, 'email') or not request.email:
             return Response({'error': 'Требуется авторизация'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        try:
-            user = CustomUser.objects.get(email=request.email, is_active=True)
-            user.is_active = False
-            user.save()
+        user = get_request_user(request)
+        if user is None:
+            return Response({'error': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
 
-            return Response({
-                'message': 'Аккаунт успешно деактивирован',
-                'deleted_user_email': user.email
-            }, status=status.HTTP_200_OK)
+        user.is_active = False
+        user.save()
 
-        except CustomUser.DoesNotExist:
-            return Response({'error': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'message': 'Аккаунт успешно деактивирован',
+            'deleted_user_email': user.email
+        }, status=status.HTTP_200_OK)
 
 
 @method_decorator(require_authentication, name='dispatch')
-class RoleViewSet(viewsets.ModelViewSet):
+class RoleViewSet(RbacETagMixin, RelatedLoadingMixin, viewsets.ModelViewSet):
     serializer_class = RoleSerializer
 
     def get_queryset(self):
-        try:
-            user_roles = CustomUser.objects.get(email=self.request.email, is_active=True).roles.all()
-        except CustomUser.DoesNotExist:
+        user_id = get_request_user_id(self.request)
+        if user_id is None:
             return Role.objects.none()
 
-        has_read_all = AccessRule.objects.filter(
-            role__in=user_roles,
-            element__name='roles',
-            read_all_permission=True
-        ).exists()
+        has_read_all = has_permission(get_request_role_ids(self.request), 'roles', 'read_all_permission')
 
         if has_read_all:
             return Role.objects.all()
@@ -156,20 +183,15 @@ class RoleViewSet(viewsets.ModelViewSet):
 
 
 @method_decorator(require_authentication, name='dispatch')
-class AccessRuleViewSet(viewsets.ModelViewSet):
+class AccessRuleViewSet(RbacETagMixin, RelatedLoadingMixin, viewsets.ModelViewSet):
     serializer_class = AccessRuleSerializer
 
     def get_queryset(self):
-        try:
-            user_roles = CustomUser.objects.get(email=self.request.email, is_active=True).roles.all()
-        except CustomUser.DoesNotExist:
+        user_id = get_request_user_id(self.request)
+        if user_id is None:
             return AccessRule.objects.none()
 
-        has_read_all = AccessRule.objects.filter(
-            role__in=user_roles,
-            element__name='access_rules',
-            read_all_permission=True
-        ).exists()
+        has_read_all = has_permission(get_request_role_ids(self.request), 'access_rules', 'read_all_permission')
 
         if has_read_all:
             return AccessRule.objects.all()
@@ -208,20 +230,15 @@ class AccessRuleViewSet(viewsets.ModelViewSet):
 
 
 @method_decorator(require_authentication, name='dispatch')
-class BusinessElementViewSet(viewsets.ModelViewSet):
+class BusinessElementViewSet(RbacETagMixin, RelatedLoadingMixin, viewsets.ModelViewSet):
     serializer_class = BusinessElementSerializer
 
     def get_queryset(self):
-        try:
-            user_roles = CustomUser.objects.get(email=self.request.email, is_active=True).roles.all()
-        except CustomUser.DoesNotExist:
+        user_id = get_request_user_id(self.request)
+        if user_id is None:
             return BusinessElement.objects.none()
 
-        has_read_all = AccessRule.objects.filter(
-            role__in=user_roles,
-            element__name='business_elements',
-            read_all_permission=True
-        ).exists()
+        has_read_all = has_permission(get_request_role_ids(self.request), 'business_elements', 'read_all_permission')
 
         if has_read_all:
             return BusinessElement.objects.all()
@@ -0,0 +1,16 @@
+"""
+Бэкенд PostgreSQL Django с метрикой времени получения соединения.
+
+Без пула это полное подключение (TCP, аутентификация, настройка сессии),
+с пулом psycopg - ожидание свободного соединения. При CONN_MAX_AGE > 0
+соединение переиспользуется между запросами, и наблюдений становится мало.
+"""
+from django.db.backends.postgresql import base
+
+from apps.monitoring.metrics import DB_CONNECTION_SECONDS
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        with DB_CONNECTION_SECONDS.time(alias=self.alias, pooled='true' if self.pool else 'false'):
+            return super().get_new_connection(conn_params)
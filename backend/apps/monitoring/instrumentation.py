@@ -0,0 +1,64 @@
+"""
+Сбор статистики SQL-запросов одного HTTP-запроса через connection.execute_wrapper:
+число запросов, суммарное время в БД и повторы.
+
+Повтором считается тот же SQL-шаблон, выполненный больше одного раза
+(типичный N+1 или повторная загрузка пользователя); точный дубликат -
+тот же шаблон с теми же параметрами, его результат можно было переиспользовать.
+"""
+import time
+from collections import Counter
+
+from django.db import connections
+
+
+class QueryStats:
+    """Обертка execute_wrapper, накапливающая статистику запросов"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ns = 0
+        self._templates = Counter()
+        self._statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter_ns()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration_ns += time.perf_counter_ns() - started
+            self.count += 1
+            self._templates[sql] += 1
+            self._statements[(sql, repr(params))] += 1
+
+    @property
+    def duration_ms(self):
+        return self.duration_ns / 1e6
+
+    @property
+    def repeated_queries(self):
+        """Сколько запросов повторили уже выполненный SQL-шаблон"""
+        return sum(count - 1 for count in self._templates.values())
+
+    @property
+    def duplicate_queries(self):
+        """Сколько запросов точно повторили уже выполненный запрос с теми же параметрами"""
+        return sum(count - 1 for count in self._statements.values())
+
+    def most_repeated(self):
+        """Самый часто повторяемый SQL-шаблон и число его выполнений"""
+        if not self._templates:
+            return None, 0
+        sql, count = self._templates.most_common(1)[0]
+        return (sql, count) if count > 1 else (None, 0)
+
+    def install(self):
+        """Подключает обертку ко всем соединениям текущего потока"""
+        for alias in connections:
+            connections[alias].execute_wrappers.append(self)
+
+    def uninstall(self):
+        for alias in connections:
+            wrappers = connections[alias].execute_wrappers
+            if self in wrappers:
+                wrappers.remove(self)
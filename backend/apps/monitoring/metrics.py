@@ -0,0 +1,255 @@
+"""
+Реестр метрик процесса в стиле Prometheus: счетчики и гистограммы с метками
+и отдача в текстовом формате exposition 0.0.4.
+
+Каждый воркер gunicorn - отдельный процесс со своими значениями. Если задан
+METRICS_MULTIPROC_DIR, процесс периодически (не чаще METRICS_FLUSH_INTERVAL)
+сохраняет снимок своих метрик в файл этого каталога, а /metrics суммирует
+снимки всех процессов. Файлы завершившихся воркеров остаются, поэтому счетчики
+не сбрасываются при перезапуске воркера; каталог очищается при старте сервиса.
+"""
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    type = None
+    suffix = ''
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name}: ожидаются метки {self.labelnames}, переданы {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    type = 'counter'
+    suffix = '_total'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def samples(self, key, value):
+        yield self.name + self.suffix, key, value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            state = self._values.get(key)
+            if state is None:
+                # Счетчики по корзинам (последняя - +Inf), сумма и число наблюдений
+                state = self._values[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+                    break
+            else:
+                state['buckets'][-1] += 1
+            state['sum'] += value
+            state['count'] += 1
+        self.registry.maybe_flush()
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+        total['buckets'] = [a + b for a, b in zip(total['buckets'], value['buckets'])]
+        total['sum'] += value['sum']
+        total['count'] += value['count']
+        return total
+
+    def snapshot(self):
+        return [[list(key), dict(value, buckets=list(value['buckets']))] for key, value in self._values.items()]
+
+    def samples(self, key, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), value['buckets']):
+            cumulative += count
+            yield self.name + '_bucket', key + (('le', _format_bound(bound)),), cumulative
+        yield self.name + '_sum', key, value['sum']
+        yield self.name + '_count', key, value['count']
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._metrics = {}
+        self._flushed_at = 0.0
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def reset(self):
+        with self.lock:
+            for metric in self._metrics.values():
+                metric._values.clear()
+
+    # Общий каталог для нескольких процессов
+
+    @staticmethod
+    def multiproc_dir():
+        return settings.METRICS_MULTIPROC_DIR
+
+    def _process_file(self, directory):
+        return os.path.join(directory, f'metrics_{os.getpid()}.json')
+
+    def maybe_flush(self):
+        directory = self.multiproc_dir()
+        if directory and time.monotonic() - self._flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush(directory)
+
+    def flush(self, directory):
+        # Запись под блокировкой: потоки процесса пишут один и тот же файл
+        with self.lock:
+            self._flushed_at = time.monotonic()
+            path = self._process_file(directory)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.snapshot(), file)
+            os.replace(tmp_path, path)
+
+    def _snapshots(self):
+        """Снимки всех процессов; снимок текущего процесса берется из памяти"""
+        directory = self.multiproc_dir()
+        if not directory:
+            return [self.snapshot()]
+        self.flush(directory)
+        snapshots = []
+        for filename in os.listdir(directory):
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(directory, filename), encoding='utf-8') as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def collect(self):
+        """Значения всех метрик, просуммированные по процессам: {имя: {метки: значение}}"""
+        merged = {name: {} for name in self._metrics}
+        for snapshot in self._snapshots():
+            for name, values in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in values:
+                    key = tuple(key)
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+        return merged
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus"""
+        lines = []
+        for name, values in sorted(self.collect().items()):
+            metric = self._metrics[name]
+            lines.append(f'# HELP {name}{metric.suffix} {metric.documentation}')
+            lines.append(f'# TYPE {name}{metric.suffix} {metric.type}')
+            for key, value in sorted(values.items()):
+                labels = tuple(zip(metric.labelnames, key))
+                for sample_name, sample_labels, sample_value in metric.samples(labels, value):
+                    label_text = ','.join(f'{label}="{_escape(text)}"' for label, text in sample_labels)
+                    lines.append(f'{sample_name}{{{label_text}}} {sample_value}' if label_text
+                                 else f'{sample_name} {sample_value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    'http_request_duration_seconds', 'Время обработки запроса по действию вьюсета',
+    ('view', 'method', 'status'),
+)
+PERMISSION_CHECKS = registry.counter(
+    'rbac_permission_checks', 'Проверки require_permission по бизнес-элементу и типу права',
+    ('element', 'permission', 'result'),
+)
+JWT_DECODE_FAILURES = registry.counter(
+    'jwt_decode_failures', 'Отклоненные токены по причине', ('reason',),
+)
+PASSWORD_HASHING_SECONDS = registry.histogram(
+    'password_hashing_seconds', 'Время bcrypt при входе и регистрации, включая ожидание в пуле', ('operation',),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+CACHE_REQUESTS = registry.counter(
+    'cache_requests', 'Обращения к кешам приложения (попадания и промахи)', ('cache', 'result'),
+)
+DB_CONNECTION_SECONDS = registry.histogram(
+    'db_connection_acquire_seconds', 'Время получения соединения с БД: новое подключение или ожидание в пуле',
+    ('alias', 'pooled'),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0),
+)
@@ -0,0 +1,146 @@
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import QueryStats
+from .metrics import REQUEST_LATENCY
+
+logger = logging.getLogger('apps.monitoring')
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Считает SQL-запросы и время в БД для доли запросов REQUEST_INSTRUMENTATION_SAMPLE_RATE.
+    Итоги отдаются в заголовке Server-Timing и пишутся одной JSON-строкой в лог apps.monitoring.
+
+    Запросы, выполненные при потоковой отдаче ответа (выгрузка), уже после выхода
+    из middleware, в статистику не попадают.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def sampled():
+        rate = settings.REQUEST_INSTRUMENTATION_SAMPLE_RATE
+        return rate >= 1 or random.random() < rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        stats = QueryStats()
+        started = time.perf_counter_ns()
+        stats.install()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats.uninstall()
+        self.report(request, response, stats, time.perf_counter_ns() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        # Синхронный код запроса (ORM, вьюсеты DRF) выполняется в потоке sync_to_async,
+        # общем для всего запроса, - обертка ставится на соединения этого потока
+        stats = QueryStats()
+        started = time.perf_counter_ns()
+        await sync_to_async(stats.install)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stats.uninstall)()
+        self.report(request, response, stats, time.perf_counter_ns() - started)
+        return response
+
+    def report(self, request, response, stats, duration_ns):
+        total_ms = duration_ns / 1e6
+        if settings.REQUEST_INSTRUMENTATION_HEADER:
+            timing = (
+                f'db;dur={stats.duration_ms:.3f};desc="queries={stats.count} repeated={stats.repeated_queries}", '
+                f'app;dur={total_ms:.3f}'
+            )
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        most_repeated_sql, most_repeated_count = stats.most_repeated()
+        logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 3),
+            'db_queries': stats.count,
+            'db_time_ms': round(stats.duration_ms, 3),
+            'repeated_queries': stats.repeated_queries,
+            'duplicate_queries': stats.duplicate_queries,
+            'most_repeated_sql': most_repeated_sql[:300] if most_repeated_sql else None,
+            'most_repeated_count': most_repeated_count,
+        }, ensure_ascii=False))
+
+
+def view_label(request):
+    """
+    Метка представления без идентификаторов из URL: для вьюсетов DRF -
+    класс и действие (ProjectViewSet.list), иначе класс или имя представления
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    func = match.func
+    cls = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if cls is None:
+        return match.view_name or func.__name__
+    actions = getattr(func, 'actions', None)
+    if actions:
+        method = request.method.lower()
+        return f'{cls.__name__}.{actions.get(method, method)}'
+    return cls.__name__
+
+
+class MetricsMiddleware:
+    """Гистограмма времени обработки запросов по действию вьюсета, методу и статусу"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def observe(request, response, duration):
+        REQUEST_LATENCY.observe(
+            duration, view=view_label(request), method=request.method, status=response.status_code
+        )
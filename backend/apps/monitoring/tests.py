@@ -0,0 +1,163 @@
+import json
+import os
+import tempfile
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+
+from apps.custom_auth.models import AccessRule, BusinessElement, CustomUser, Role
+from apps.monitoring.instrumentation import QueryStats
+from apps.monitoring.metrics import CACHE_REQUESTS, DB_CONNECTION_SECONDS, PERMISSION_CHECKS, MetricsRegistry, registry
+
+
+class QueryStatsTestCase(TestCase):
+    def test_counts_repeated_and_duplicate_queries(self):
+        user = CustomUser.objects.create(email='user@test.com', first_name='User')
+        stats = QueryStats()
+        stats.install()
+        try:
+            CustomUser.objects.get(pk=user.pk)
+            CustomUser.objects.get(pk=user.pk)
+            CustomUser.objects.filter(pk=user.pk + 1).first()
+            CustomUser.objects.count()
+        finally:
+            stats.uninstall()
+
+        self.assertEqual(stats.count, 4)
+        self.assertEqual(stats.repeated_queries, 1)
+        self.assertEqual(stats.duplicate_queries, 1)
+        sql, count = stats.most_repeated()
+        self.assertIn('"custom_auth_customuser"', sql)
+        self.assertEqual(count, 2)
+        self.assertGreater(stats.duration_ns, 0)
+        self.assertNotIn(stats, connection.execute_wrappers)
+
+
+class QueryInstrumentationMiddlewareTestCase(TestCase):
+    def login(self, client):
+        return client.post('/api/auth/login/', {'email': 'missing@test.com', 'password': 'secret'})
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs('apps.monitoring', 'INFO') as logs:
+            response = self.login(Client())
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('queries=1 ', response['Server-Timing'])
+        self.assertIn('app;dur=', response['Server-Timing'])
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], '/api/auth/login/')
+        self.assertEqual(record['status'], response.status_code)
+        self.assertEqual(record['db_queries'], 1)
+        self.assertEqual(record['repeated_queries'], 0)
+
+    def test_async_requests_are_instrumented(self):
+        response = async_to_sync(self.async_client.get)('/api/v1/async/projects/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('queries=0 ', response['Server-Timing'])
+
+    @override_settings(REQUEST_INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_instrumented(self):
+        response = self.login(Client())
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(REQUEST_INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        response = self.login(Client())
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class MetricsRegistryTestCase(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.counter('test_requests', 'Запросы', ('result',))
+        self.latency = self.registry.histogram('test_latency_seconds', 'Задержка', ('view',), buckets=(0.1, 1.0))
+
+    def test_text_format(self):
+        self.requests.inc(result='hit')
+        self.requests.inc(2, result='hit')
+        self.latency.observe(0.05, view='list')
+        self.latency.observe(5, view='list')
+        text = self.registry.render()
+        self.assertIn('# TYPE test_requests_total counter\n', text)
+        self.assertIn('test_requests_total{result="hit"} 3\n', text)
+        self.assertIn('# TYPE test_latency_seconds histogram\n', text)
+        self.assertIn('test_latency_seconds_bucket{view="list",le="0.1"} 1\n', text)
+        self.assertIn('test_latency_seconds_bucket{view="list",le="1.0"} 1\n', text)
+        self.assertIn('test_latency_seconds_bucket{view="list",le="+Inf"} 2\n', text)
+        self.assertIn('test_latency_seconds_count{view="list"} 2\n', text)
+
+    def test_labels_must_match(self):
+        with self.assertRaises(ValueError):
+            self.requests.inc(status='hit')
+
+    def test_processes_aggregated_through_shared_directory(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_MULTIPROC_DIR=directory, METRICS_FLUSH_INTERVAL=0):
+            # Снимок другого (например, завершившегося) воркера
+            with open(os.path.join(directory, 'metrics_999999.json'), 'w') as file:
+                json.dump({
+                    'test_requests': [[['hit'], 5]],
+                    'test_latency_seconds': [[['list'], {'buckets': [1, 0, 0], 'sum': 0.01, 'count': 1}]],
+                }, file)
+            self.requests.inc(result='hit')
+            self.latency.observe(0.5, view='list')
+            collected = self.registry.collect()
+        self.assertEqual(collected['test_requests'][('hit',)], 6)
+        self.assertEqual(collected['test_latency_seconds'][('list',)]['buckets'], [1, 1, 0])
+
+
+class MetricsEndpointTestCase(TestCase):
+    def setUp(self):
+        registry.reset()
+
+    def test_metrics_endpoint(self):
+        client = Client()
+        client.post('/api/auth/login/', {'email': 'missing@test.com', 'password': 'secret'})
+        client.get('/api/v1/projects/', headers={'Authorization': 'Bearer invalid'})
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="LoginView",method="POST",status="401"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{view="ProjectViewSet.list",method="GET",status="401"} 1', text)
+        self.assertIn('jwt_decode_failures_total{reason="invalid"} 1', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_metrics_endpoint_restricted_to_allowed_ips(self):
+        client = Client()
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        self.assertEqual(client.get('/metrics', REMOTE_ADDR='192.168.1.5').status_code, 403)
+        self.assertEqual(client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_metrics_endpoint_disabled(self):
+        self.assertEqual(Client().get('/metrics').status_code, 404)
+
+    def test_permission_checks_counted(self):
+        role = Role.objects.create(name='user')
+        element = BusinessElement.objects.create(name='projects')
+        AccessRule.objects.create(role=role, element=element, create_permission=False)
+        user = CustomUser.objects.create(email='user@test.com', first_name='User')
+        user.roles.add(role)
+        client = Client(headers={'Authorization': f'Bearer {user.generate_jwt_token()}'})
+        response = client.post('/api/v1/projects/', {'title': 'Project', 'description': 'Denied'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(PERMISSION_CHECKS.value(element='projects', permission='create_permission', result='deny'), 1)
+        self.assertEqual(CACHE_REQUESTS.value(cache='jwt_decode', result='miss'), 1)
+
+
+@skipUnless(connection.settings_dict['ENGINE'] == 'apps.monitoring.backends.postgresql',
+            'Метрику соединений пишет бэкенд apps.monitoring.backends.postgresql')
+class DatabaseConnectionMetricsTestCase(TestCase):
+    def test_new_connection_observed(self):
+        registry.reset()
+        # Отдельное соединение: основное занято транзакцией теста
+        new_connection = connection.copy()
+        try:
+            new_connection.ensure_connection()
+        finally:
+            new_connection.close()
+        observed = DB_CONNECTION_SECONDS.snapshot()
+        self.assertEqual(sum(value['count'] for _, value in observed), 1)
@@ -0,0 +1,27 @@
+import ipaddress
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .metrics import registry
+
+
+def metrics_client_allowed(request):
+    """Адрес клиента входит в METRICS_ALLOWED_IPS (адреса или подсети)"""
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_IPS)
+
+
+@require_GET
+def metrics_view(request):
+    """Метрики всех процессов в текстовом формате Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    # Метрики раскрывают задержки и отказы по эндпоинтам, а сбор читает снимки всех процессов
+    if not metrics_client_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
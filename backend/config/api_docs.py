@@ -0,0 +1,27 @@
+"""
+Точка импорта drf_yasg для модулей swagger_schemas.
+
+При API_DOCS_ENABLED=False (по умолчанию в production) drf_yasg не импортируется:
+swagger_auto_schema возвращает представление без изменений, а конструкторы
+и константы openapi ничего не строят - воркер не тратит время на схемы,
+которые никто не запросит.
+"""
+from django.conf import settings
+
+if settings.API_DOCS_ENABLED:
+    from drf_yasg import openapi
+    from drf_yasg.utils import swagger_auto_schema
+else:
+    def _noop(*args, **kwargs):
+        return None
+
+    class _DisabledOpenAPI:
+        """Заглушка drf_yasg.openapi: любой атрибут (Schema, Response, TYPE_OBJECT, ...) - пустышка"""
+
+        def __getattr__(self, name):
+            return _noop
+
+    openapi = _DisabledOpenAPI()
+
+    def swagger_auto_schema(*args, **kwargs):
+        return lambda view: view
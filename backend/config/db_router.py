@@ -0,0 +1,163 @@
+"""
+Чтение с реплик PostgreSQL с привязкой к основной БД после записи.
+
+Безопасные чтения (списки, просмотр, роли и правила доступа) уходят на одну
+из реплик DATABASE_REPLICAS, запись - в default. Чтобы пользователь сразу видел
+свои изменения, несмотря на отставание реплик:
+
+- небезопасные запросы (POST, PUT, PATCH, DELETE) целиком читают из default;
+- после записи ответ ставит cookie REPLICA_STICKY_COOKIE, и следующие
+  REPLICA_STICKY_SECONDS секунд запросы этого клиента тоже читают из default.
+
+Реплика, к которой не удалось подключиться, пропускается REPLICA_RETRY_SECONDS
+секунд; если недоступны все, чтение идет в default.
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Приложения, которые всегда читаются из default: кеш в БД хранит общий счетчик
+# поколений RBAC, и incr (чтение + запись) не должен читать отстающую реплику
+PRIMARY_ONLY_APPS = {'django_cache'}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    """Состояние маршрутизации текущего запроса"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока идут в основную БД"""
+    token = _state.set(RoutingState(pinned=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+_unavailable_until = {}
+
+
+def replica_available(alias):
+    """Подключается к реплике (если соединения еще нет); при ошибке исключает ее на время"""
+    if _unavailable_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError as error:
+        _unavailable_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        logger.warning('Реплика %s недоступна, чтение идет в основную БД: %s', alias, error)
+        return False
+    return True
+
+
+def reset_replica_health():
+    _unavailable_until.clear()
+
+
+class ReplicaRouter:
+    """Роутер DATABASE_ROUTERS; без настроенных реплик ни на что не влияет"""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return None
+        state = _state.get()
+        if (state is not None and state.pinned) or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        for alias in random.sample(replicas, len(replicas)):
+            if replica_available(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        state = _state.get()
+        if state is not None:
+            # Чтения после записи в том же запросе тоже идут в основную БД
+            state.pinned = state.wrote = True
+        # Явно default: иначе объект, прочитанный с реплики, сохранялся бы в нее
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит с основной БД через репликацию
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+class PrimaryStickinessMiddleware:
+    """Выбирает БД для чтений запроса и ставит cookie привязки к default после записи"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def start(request):
+        try:
+            sticky = float(request.COOKIES.get(settings.REPLICA_STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        return RoutingState(pinned=sticky or request.method not in SAFE_METHODS)
+
+    @staticmethod
+    def finish(state, response):
+        if state.wrote:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, f'{time.time() + seconds:.3f}',
+                max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        # Контекст копируется в потоки sync_to_async, где выполняется ORM
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по (-created_at, id), совпадающая с Meta.ordering моделей.
+    Курсор кодирует позицию последней записи, поэтому стоимость страницы
+    не растет с ее номером, а токены стабильны при вставке новых записей.
+    """
+    ordering = ('-created_at', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
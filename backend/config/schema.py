@@ -0,0 +1,118 @@
+"""
+OpenAPI-схема, собранная один раз на процесс (или на деплой).
+
+drf_yasg при каждом запросе к swagger.json обходит все вьюсеты и декораторы
+swagger_auto_schema. Здесь схема строится при первом обращении либо читается
+из файлов, заранее записанных командой generate_schema, и дальше отдается
+из памяти с ETag - повторные опросы получают 304 без тела.
+"""
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import condition, require_GET
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+SCHEMA_FORMATS = {
+    '.json': (OpenAPICodecJson, 'application/json'),
+    '.yaml': (OpenAPICodecYaml, 'application/yaml'),
+}
+
+API_INFO = openapi.Info(
+    title="Snippets API",
+    default_version='v1',
+    description="API для демонстрации работы управления ролями пользователей и их правами",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+
+@dataclass(frozen=True)
+class SchemaDocument:
+    content: bytes
+    content_type: str
+    etag: str
+
+    @classmethod
+    def from_content(cls, content, content_type):
+        return cls(content, content_type, hashlib.sha256(content).hexdigest()[:32])
+
+
+def schema_filename(directory, format):
+    return os.path.join(directory, f'openapi{format}')
+
+
+def generate_schema_documents():
+    """Строит схему (одинаковую для всех пользователей, public) и кодирует ее во все форматы"""
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(request=None, public=True)
+    return {
+        format: SchemaDocument.from_content(codec_class(validators=[]).encode(schema), content_type)
+        for format, (codec_class, content_type) in SCHEMA_FORMATS.items()
+    }
+
+
+def write_schema_files(directory):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for format, document in generate_schema_documents().items():
+        path = schema_filename(directory, format)
+        with open(path, 'wb') as file:
+            file.write(document.content)
+        paths.append(path)
+    return paths
+
+
+def _load_schema_documents():
+    directory = settings.API_SCHEMA_DIR
+    if directory and all(os.path.exists(schema_filename(directory, format)) for format in SCHEMA_FORMATS):
+        documents = {}
+        for format, (_, content_type) in SCHEMA_FORMATS.items():
+            with open(schema_filename(directory, format), 'rb') as file:
+                documents[format] = SchemaDocument.from_content(file.read(), content_type)
+        return documents
+    return generate_schema_documents()
+
+
+_documents = None
+_lock = threading.Lock()
+
+
+def get_schema_document(format):
+    """Документ схемы процесса; None для неизвестного формата"""
+    global _documents
+    if format not in SCHEMA_FORMATS:
+        return None
+    if _documents is None:
+        with _lock:
+            if _documents is None:
+                _documents = _load_schema_documents()
+    return _documents[format]
+
+
+def reset_schema_cache():
+    global _documents
+    with _lock:
+        _documents = None
+
+
+def _schema_etag(request, format):
+    document = get_schema_document(format)
+    return document.etag if document is not None else None
+
+
+@require_GET
+@condition(etag_func=_schema_etag)
+def schema_view(request, format):
+    document = get_schema_document(format)
+    if document is None:
+        raise Http404
+    response = HttpResponse(document.content, content_type=document.content_type)
+    # Клиент может хранить схему, но обязан сверять ETag - после деплоя получит новую
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -44,9 +44,14 @@ INSTALLED_APPS = [
     # My apps
     'apps.custom_auth.apps.CustomAuthConfig',
     'apps.content.apps.ContentConfig',
+    'apps.benchmarks.apps.BenchmarksConfig',
+    'apps.monitoring.apps.MonitoringConfig',
 ]
 
 MIDDLEWARE = [
+    'apps.monitoring.middleware.MetricsMiddleware',
+    'apps.monitoring.middleware.QueryInstrumentationMiddleware',
+    'config.db_router.PrimaryStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,8 +66,20 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [],
     'DEFAULT_PERMISSION_CLASSES': [],
     'UNAUTHENTICATED_USER': None,
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Верхняя граница для параметра page_size в списках
+API_MAX_PAGE_SIZE = 500
+
+# Размер порции, которой потоковая выгрузка читает строки из БД
+EXPORT_CHUNK_SIZE = 2000
+
+# Пакетные эндпоинты: максимум объектов в запросе и размер порции INSERT/UPDATE
+BULK_MAX_ITEMS = 1000
+BULK_BATCH_SIZE = 500
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -93,6 +110,18 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения - алиасы из DATABASES (через запятую в DATABASE_REPLICAS).
+# Пусто - все запросы идут в default, роутер ни на что не влияет
+DATABASE_REPLICAS = [alias for alias in os.getenv('DATABASE_REPLICAS', '').split(',') if alias]
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+
+# Сколько секунд после записи клиент читает из основной БД (cookie)
+REPLICA_STICKY_SECONDS = 5
+REPLICA_STICKY_COOKIE = 'db_primary_until'
+
+# Сколько секунд недоступная реплика не используется
+REPLICA_RETRY_SECONDS = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -112,6 +141,12 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Swagger/ReDoc и OpenAPI-схема. Если выключено, drf_yasg не импортируется,
+# а декораторы swagger_auto_schema ничего не делают
+API_DOCS_ENABLED = os.getenv('API_DOCS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+if not API_DOCS_ENABLED:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'drf_yasg']
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -121,6 +156,7 @@ SWAGGER_SETTINGS = {
             'description': 'JWT токен в формате: Bearer <token>'
         }
     },
+    'DEFAULT_AUTO_SCHEMA_CLASS': 'config.swagger.PaginatedAutoSchema',
     'USE_SESSION_AUTH': False,
     'JSON_EDITOR': True,
     'SUPPORTED_SUBMIT_METHODS': [
@@ -137,8 +173,17 @@ SWAGGER_SETTINGS = {
     'SHOW_EXTENSIONS': True,
     'DEFAULT_MODEL_RENDERING': 'example',
     'STATIC_URL': '/static/',
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
 
+# Каталог с заранее сгенерированной схемой (manage.py generate_schema).
+# Если не задан или файлов нет - схема строится при первом запросе процесса
+API_SCHEMA_DIR = os.getenv('API_SCHEMA_DIR') or None
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -146,6 +191,65 @@ SWAGGER_SETTINGS = {
 
 JWT_TOKEN_LIFETIME_HOURS = 24
 
+# Добавлять в токен id пользователя, id ролей и поколение RBAC
+JWT_EMBED_AUTHORIZATION_CLAIMS = True
+
+# LRU-кеш декодированных токенов в каждом процессе: число записей и время жизни записи (сек)
+JWT_DECODE_CACHE_SIZE = 10000
+JWT_DECODE_CACHE_TTL = 300
+
+# Стоимость bcrypt (log2 числа раундов). Хеши с другой стоимостью пересчитываются при входе
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+
+# Пул bcrypt в каждом процессе: одновременные операции и длина очереди сверх них.
+# Вход ждет результат в потоке запроса, поэтому сумма должна быть меньше --threads
+# gunicorn (4 в docker-compose): иначе волна входов займет все потоки раньше, чем придет 503
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', 2))
+PASSWORD_HASHING_QUEUE_SIZE = int(os.getenv('PASSWORD_HASHING_QUEUE_SIZE', 1))
+
+# Кеш, в котором хранится общий для всех воркеров счетчик поколений RBAC
+RBAC_CACHE_ALIAS = 'default'
+
+# Кеш ответов списков бизнес-данных (apps.content.cache): где хранятся ответы, сколько (сек)
+# и общий для всех воркеров кеш версий данных моделей
+CONTENT_LIST_CACHE_ENABLED = True
+CONTENT_LIST_CACHE_ALIAS = 'default'
+CONTENT_LIST_CACHE_TIMEOUT = 300
+CONTENT_VERSIONS_CACHE_ALIAS = 'default'
+
+# Подсчет SQL-запросов и времени в БД на запрос: доля инструментируемых запросов (0..1),
+# итоги - в заголовке Server-Timing и JSON-строкой в логе apps.monitoring
+REQUEST_INSTRUMENTATION_ENABLED = True
+REQUEST_INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('REQUEST_INSTRUMENTATION_SAMPLE_RATE', 1.0))
+REQUEST_INSTRUMENTATION_HEADER = True
+
+# Метрики Prometheus (/metrics). Каталог, через который процессы gunicorn
+# объединяют свои метрики, и как часто процесс сохраняет в него снимок (сек)
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR') or None
+METRICS_FLUSH_INTERVAL = 1.0
+# Кому отдается /metrics: адреса и подсети через запятую (REMOTE_ADDR, без заголовков прокси)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+METRICS_ALLOWED_IPS = [
+    network.strip() for network in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if network.strip()
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'apps.monitoring': {
+            'handlers': ['console'],
+            'level': os.getenv('MONITORING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
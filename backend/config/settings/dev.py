@@ -1,5 +1,21 @@
+import os
+import sys
+
 from .base import *
 
 DEBUG = True
 
 ALLOWED_HOSTS = []
+
+# Реплика для локальной проверки чтения с реплик (DATABASE_REPLICAS=replica):
+# та же база SQLite, в тестах - зеркало тестовой базы default
+DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+# Дешевый bcrypt для разработки и тестов; стоимость можно задать для замеров
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 4))
+
+# Строки лога инструментирования не засоряют вывод тестов.
+# Кеш списков в тестах включается явно: откат транзакции теста не откатывает версии данных
+if 'test' in sys.argv[1:2]:
+    LOGGING['loggers']['apps.monitoring']['level'] = 'WARNING'
+    CONTENT_LIST_CACHE_ENABLED = False
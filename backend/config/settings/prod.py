@@ -1,6 +1,9 @@
+import importlib.util
 import os
 
-from base import *
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *
 
 
 DEBUG = True
@@ -11,11 +14,69 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Бэкенд postgresql с метрикой времени получения соединения (db_connection_acquire_seconds)
+        'ENGINE': 'apps.monitoring.backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'db'),
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': 'db',
         'PORT': '5432',
+        # Соединение живет между запросами потока (сек) вместо подключения на каждый запрос;
+        # перед повторным использованием проверяется, что оно не разорвано
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+}
+
+# Пул соединений psycopg 3 в каждом процессе (пакеты psycopg и psycopg-pool из requirements.txt).
+# Размер пула - на воркер: обычно равен числу потоков gunicorn (--threads).
+# С пулом Django не держит постоянные соединения: CONN_MAX_AGE должен быть 0
+DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+if DB_POOL_ENABLED:
+    if importlib.util.find_spec('psycopg_pool') is None:
+        # Иначе Django выберет psycopg2 и упадет только на первом подключении
+        raise ImproperlyConfigured('DB_POOL_ENABLED требует psycopg 3 с пулом: pip install "psycopg[binary,pool]"')
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 4)),
+        # Сколько запрос ждет свободное соединение, прежде чем получить ошибку (сек)
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    }
+
+# Общий для всех воркеров gunicorn кеш (поколение RBAC, версии данных и т.п.)
+# и кеш ответов списков в памяти каждого процесса
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    },
+    'content_lists': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'content_lists',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+CONTENT_LIST_CACHE_ALIAS = 'content_lists'
+
+# В production инструментируется только часть запросов
+REQUEST_INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('REQUEST_INSTRUMENTATION_SAMPLE_RATE', 0.05))
+
+# /metrics в production включается явно; METRICS_ALLOWED_IPS - адреса Prometheus
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Документация API в production по умолчанию отключена - воркеры не загружают drf_yasg
+API_DOCS_ENABLED = os.getenv('API_DOCS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+if not API_DOCS_ENABLED:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'drf_yasg']
+
+# Реплики для чтения: хосты через запятую, параметры подключения - как у default
+REPLICA_HOSTS = [host for host in os.getenv('POSTGRES_REPLICA_HOSTS', '').split(',') if host]
+for index, host in enumerate(REPLICA_HOSTS, start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'], 'HOST': host, 'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
     }
-}
\ No newline at end of file
+if REPLICA_HOSTS:
+    DATABASE_REPLICAS = [f'replica{index}' for index in range(1, len(REPLICA_HOSTS) + 1)]
@@ -0,0 +1,14 @@
+from drf_yasg import openapi
+from drf_yasg.inspectors import SwaggerAutoSchema
+
+
+class PaginatedAutoSchema(SwaggerAutoSchema):
+    """Оборачивает явно описанный в swagger_schemas ответ-список в схему страницы пагинатора"""
+
+    def get_response_schemas(self, response_serializers):
+        responses = super().get_response_schemas(response_serializers)
+        response = responses.get('200')
+        schema = getattr(response, 'schema', None)
+        if self.should_page() and getattr(schema, 'type', None) == openapi.TYPE_ARRAY:
+            response.schema = self.get_paginated_response(schema) or schema
+        return responses
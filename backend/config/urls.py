@@ -18,27 +18,29 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
 from django.urls import re_path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Snippets API",
-      default_version='v1',
-      description="API для демонстрации работы управления ролями пользователей и их правами",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@snippets.local"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   # permission_classes=(permissions.AllowAny,),
-)
+from apps.monitoring.views import metrics_view
 
 urlpatterns = [
-   path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-   path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-   path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
    path('api/auth/', include('apps.custom_auth.urls')),
    path('api/v1/', include('apps.content.urls')),
+   path('metrics', metrics_view, name='metrics'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+
+if settings.API_DOCS_ENABLED:
+   # drf_yasg импортируется только при включенной документации
+   from drf_yasg.views import get_schema_view
+
+   from config.schema import API_INFO, schema_view as cached_schema_view
+
+   schema_view = get_schema_view(
+      API_INFO,
+      public=True,
+      # permission_classes=(permissions.AllowAny,),
+   )
+
+   urlpatterns += [
+      # Схема собирается один раз и отдается из памяти с ETag; UI загружают ее по SPEC_URL
+      path('swagger<format>/', cached_schema_view, name='schema-json'),
+      path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+      path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+   ]